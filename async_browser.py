@@ -0,0 +1,121 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from tqdm import tqdm
+
+CLOSE_TIMEOUT = 10
+REOPEN_ATTEMPTS = 3
+REOPEN_BACKOFF = 1.0
+
+def run_async(coroutine) -> Any:
+    # main() drives a sync Playwright session, which owns this thread's event loop, so async
+    # stages run to completion on a loop of their own in a helper thread
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
+
+async def close_quietly(context):
+    try:
+        await asyncio.wait_for(context.close(), CLOSE_TIMEOUT)
+    except Exception:
+        pass
+
+# One pooled page working through `queue` until it takes a None. Every item runs in the same
+# browser context; an item that fails or exceeds `timeout` seconds throws the context away and
+# opens a fresh one, so one hung tab only costs that item. If no fresh page can be opened after
+# REOPEN_ATTEMPTS tries (the browser crashed, or `setup_page` keeps failing), the remaining items
+# go to `on_error` instead of aborting the whole stage. `on_result(item, result)` is awaited
+# outside the timeout, so it may block on a downstream queue.
+async def page_worker(
+    browser,
+    queue: asyncio.Queue,
+    handler: Callable[[Any, Any], Awaitable[Any]],
+    timeout: float,
+    on_error: Callable[[Any, Exception], Any],
+    on_result: Callable[[Any, Any], Awaitable[None]],
+    context_options: Optional[Dict] = None,
+    setup_page: Optional[Callable[[Any], Awaitable[None]]] = None,
+):
+    open_error = None
+
+    async def open_page():
+        nonlocal open_error
+        for attempt in range(REOPEN_ATTEMPTS):
+            if attempt:
+                await asyncio.sleep(REOPEN_BACKOFF * 2 ** (attempt - 1))
+            context = None
+            try:
+                context = await browser.new_context(**(context_options or {}))
+                page = await context.new_page()
+                if setup_page:
+                    await setup_page(page)
+                return context, page
+            except Exception as e:
+                open_error = e
+                if context is not None:
+                    await close_quietly(context)
+        return None, None
+
+    context, page = await open_page()
+    try:
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            if page is None:
+                result = on_error(item, open_error)
+            else:
+                try:
+                    result = await asyncio.wait_for(handler(page, item), timeout)
+                except Exception as e:
+                    result = on_error(item, e)
+                    await close_quietly(context)
+                    context, page = await open_page()
+            await on_result(item, result)
+    finally:
+        if context is not None:
+            await close_quietly(context)
+
+# Runs `handler(page, item)` for every item over `workers` pooled pages (see page_worker).
+# Results come back in input order; `on_result(index, item, result)` additionally sees each one
+# as soon as it is ready.
+async def map_pages(
+    browser,
+    items: List,
+    handler: Callable[[Any, Any], Awaitable[Any]],
+    workers: int,
+    timeout: float,
+    on_error: Callable[[Any, Exception], Any],
+    context_options: Optional[Dict] = None,
+    setup_page: Optional[Callable[[Any], Awaitable[None]]] = None,
+    desc: Optional[str] = None,
+    on_result: Optional[Callable[[int, Any, Any], None]] = None,
+) -> List:
+    workers = min(workers, len(items))
+    queue = asyncio.Queue()
+    for entry in enumerate(items):
+        queue.put_nowait(entry)
+    for _ in range(workers):
+        queue.put_nowait(None)
+    results = [None] * len(items)
+    progress = tqdm(total=len(items), desc=desc)
+
+    async def handle(page, entry):
+        return await handler(page, entry[1])
+
+    async def store(entry, result):
+        index, item = entry
+        results[index] = result
+        if on_result:
+            on_result(index, item, result)
+        progress.update(1)
+
+    try:
+        await asyncio.gather(*(
+            page_worker(browser, queue, handle, timeout, lambda entry, e: on_error(entry[1], e), store,
+                        context_options, setup_page)
+            for _ in range(workers)
+        ))
+    finally:
+        progress.close()
+    return results
@@ -0,0 +1,165 @@
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import re
+import time
+import traceback
+from typing import Dict, List
+
+import pandas as pd
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+def load_jobs(job_file: str) -> List[Dict]:
+    jobs = []
+    with open(job_file, encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            job = json.loads(line)
+            search = job.get('search') or job.get('query')
+            if not search:
+                raise ValueError(f"{job_file}:{line_number}: job has no 'search'")
+            job_id = str(job.get('id') or re.sub(r'[^A-Za-z0-9]+', '_', search).strip('_').lower())
+            jobs.append({'id': job_id, 'search': search, 'total': int(job.get('total', 100)), 'options': job.get('options', {})})
+    return jobs
+
+# Per-job status lives in one JSON file that only the parent process writes, so a rerun with
+# the same state file picks up where the last one stopped
+class BatchState:
+    def __init__(self, path: str):
+        self.path = path
+        self.jobs = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.jobs = json.load(f)
+        for entry in self.jobs.values():
+            # A job still marked running belongs to a batch that died; run it again
+            if entry['status'] == RUNNING:
+                entry['status'] = PENDING
+
+    def register(self, job: Dict):
+        entry = self.jobs.setdefault(job['id'], {'status': PENDING, 'attempts': 0, 'error': None})
+        entry.update({'search': job['search'], 'total': job['total']})
+
+    def update(self, job_id: str, **fields):
+        self.jobs[job_id].update(fields, updated_at=time.time())
+        self.save()
+
+    def save(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.jobs, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+def run_job(job: Dict, output_dir: str, resume: bool = False) -> Dict:
+    from main import main
+
+    job_dir = os.path.join(output_dir, job['id'])
+    os.makedirs(job_dir, exist_ok=True)
+    outputs = {
+        'output_csv': os.path.join(job_dir, 'business_data.csv'),
+        'output_json': os.path.join(job_dir, 'detailed_business_data.json'),
+    }
+    with open(os.path.join(job_dir, 'log.txt'), 'a', encoding='utf-8') as log, \
+            contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        try:
+            main(job['search'], job['total'], **job['options'], **outputs, resume=resume, keep_place_key=True)
+        except Exception:
+            traceback.print_exc()
+            raise
+    return outputs
+
+def _run_job_safely(task):
+    job, output_dir, resume = task
+    try:
+        return job['id'], run_job(job, output_dir, resume), None
+    except Exception as e:
+        message = str(e).strip().splitlines()
+        return job['id'], None, f"{type(e).__name__}: {message[0] if message else ''}"
+
+def run_batch(jobs: List[Dict], state: BatchState, output_dir: str, workers: int, retries: int):
+    for job in jobs:
+        state.register(job)
+    state.save()
+    jobs_by_id = {job['id']: job for job in jobs}
+    # Each job gets a fresh process (and so a fresh browser) that exits when the job ends
+    pool_context = multiprocessing.get_context('spawn')
+    for attempt in range(retries + 1):
+        runnable = [
+            job_id for job_id in jobs_by_id
+            if state.jobs[job_id]['status'] == PENDING
+            or (state.jobs[job_id]['status'] == FAILED and state.jobs[job_id]['attempts'] <= retries)
+        ]
+        if not runnable:
+            break
+        print(f"Round {attempt + 1}: running {len(runnable)} jobs on {workers} workers")
+        for job_id in runnable:
+            state.update(job_id, status=RUNNING, attempts=state.jobs[job_id]['attempts'] + 1)
+        with pool_context.Pool(workers, maxtasksperchild=1) as pool:
+            # A retry resumes from whatever the failed attempt already wrote to its run directory
+            tasks = [(jobs_by_id[job_id], output_dir, state.jobs[job_id]['attempts'] > 1) for job_id in runnable]
+            for job_id, outputs, error in pool.imap_unordered(_run_job_safely, tasks):
+                if error is None:
+                    state.update(job_id, status=DONE, error=None, **outputs)
+                    print(f"[{DONE}] {job_id}")
+                else:
+                    state.update(job_id, status=FAILED, error=error)
+                    print(f"[{FAILED}] {job_id}: {error}")
+
+def merge_outputs(state: BatchState, merged_csv: str, merged_json: str):
+    frames = []
+    details = {}
+    for job_id, entry in state.jobs.items():
+        if entry['status'] != DONE:
+            continue
+        if os.path.exists(entry['output_csv']):
+            frame = pd.read_csv(entry['output_csv'], dtype=str, keep_default_na=False)
+            frame['job_id'] = job_id
+            frames.append(frame)
+        if os.path.exists(entry['output_json']):
+            with open(entry['output_json'], encoding='utf-8') as f:
+                for record in json.load(f):
+                    if record.get('url'):
+                        details.setdefault(record['url'], record)
+    if not frames:
+        print("No finished jobs to merge.")
+        return
+    merged = pd.concat(frames, ignore_index=True, sort=False).fillna('N/A')
+    before = len(merged)
+    # Places are identified by place_key as everywhere else; only outputs written before jobs
+    # carried that column fall back to name, address and phone
+    subset = [column for column in ('Names', 'Address', 'Phone Number') if column in merged.columns]
+    if 'place_key' in merged.columns:
+        keyed = merged['place_key'] != 'N/A'
+        merged = pd.concat([
+            merged[keyed].drop_duplicates(subset=['place_key'], keep='first'),
+            merged[~keyed].drop_duplicates(subset=subset or None, keep='first'),
+        ]).sort_index()
+    else:
+        merged = merged.drop_duplicates(subset=subset or None, keep='first')
+    merged.to_csv(merged_csv, index=False)
+    with open(merged_json, 'w') as f:
+        json.dump(list(details.values()), f, indent=2)
+    print(f"Merged {before} rows from {len(frames)} jobs into {len(merged)} unique businesses ({merged_csv})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run many Google Maps searches from a JSONL job file")
+    parser.add_argument("job_file", type=str, help='JSONL file, one job per line: {"id": ..., "search": ..., "total": ..., "options": {...}}')
+    parser.add_argument("-w", "--workers", type=int, default=2, help="Number of worker processes, each with its own browser")
+    parser.add_argument("-r", "--retries", type=int, default=2, help="Times a failed job is retried")
+    parser.add_argument("--state", type=str, default="batch_state.json", help="File tracking per-job status")
+    parser.add_argument("--output-dir", type=str, default="batch_output", help="Directory for per-job outputs")
+    parser.add_argument("--merged-csv", type=str, default="merged_business_data.csv")
+    parser.add_argument("--merged-json", type=str, default="merged_detailed_business_data.json")
+    args = parser.parse_args()
+
+    state = BatchState(args.state)
+    run_batch(load_jobs(args.job_file), state, args.output_dir, args.workers, args.retries)
+    merge_outputs(state, args.merged_csv, args.merged_json)
@@ -0,0 +1,90 @@
+import argparse
+import glob
+import os
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from contact_scanner import scan, scan_file
+from html_extraction import visible_text
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# The patterns WebsiteDataExtractor used before contact_scanner.py
+EMAIL = r'[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}'
+PHONE = r'(\+\d{1,3}[-.]?)?\s*\(?\d{3}\)?[-.]?\s*\d{3}[-.]?\s*\d{4}'
+SOCIAL = {
+    'facebook': r'facebook\.com/[A-Za-z0-9.]+',
+    'instagram': r'instagram\.com/[A-Za-z0-9_]+',
+    'twitter': r'twitter\.com/[A-Za-z0-9_]+',
+    'linkedin': r'linkedin\.com/[A-Za-z0-9_]+',
+    'youtube': r'youtube\.com/[A-Za-z0-9_]+',
+}
+
+def separate_passes(text):
+    emails = [email for email in re.findall(EMAIL, text) if not email.endswith(('.png', '.jpg', '.gif', '.jpeg')) and len(email) < 100]
+    # findall returns the country-code group here, so every phone came back as '' or '+1'
+    phones = re.findall(PHONE, text)
+    social = {platform: re.compile(pattern, re.I).findall(text) for platform, pattern in SOCIAL.items()}
+    return {'emails': set(emails), 'phones': set(phones), 'social_media': {k: v for k, v in social.items() if v}}
+
+def one_pass(text):
+    return scan(text).to_dict()
+
+def _ms(function, text, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        function(text)
+    return (time.perf_counter() - start) * 1000 / rounds
+
+def _peak_mb(function, *args):
+    tracemalloc.start()
+    function(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1024 / 1024
+
+def _read_and_scan(path):
+    with open(path, encoding='utf-8') as f:
+        return separate_passes(f.read())
+
+def main(rounds, big_mb):
+    pages = {os.path.basename(path): open(path, encoding='utf-8').read() for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, '*.html')))}
+    print(f"{'page':<28}{'KB':>7}{'passes ms':>11}{'scanner ms':>12}{'speedup':>9}  phones before -> after")
+    for name, html in pages.items():
+        for label, text in ((name, visible_text(html)), (name + ' (raw)', html)):
+            before_ms = _ms(separate_passes, text, rounds)
+            after_ms = _ms(one_pass, text, rounds)
+            before, after = separate_passes(text), one_pass(text)
+            print(f"{label:<28}{len(text) / 1024:>7.1f}{before_ms:>11.3f}{after_ms:>12.3f}{before_ms / after_ms:>8.1f}x  "
+                  f"{sorted(before['phones'])} -> {after['phones']}")
+
+    # A multi-megabyte page made of the fixtures, read whole by the old code and streamed by the scanner
+    html = ''.join(pages.values())
+    with tempfile.NamedTemporaryFile('w', suffix='.html', delete=False, encoding='utf-8') as f:
+        for _ in range(max(1, int(big_mb * 1024 * 1024 / len(html)))):
+            f.write(html)
+        path = f.name
+    try:
+        size_mb = os.path.getsize(path) / 1024 / 1024
+        start = time.perf_counter()
+        _read_and_scan(path)
+        before_s = time.perf_counter() - start
+        start = time.perf_counter()
+        scan_file(path)
+        after_s = time.perf_counter() - start
+        print(f"\n{size_mb:.1f} MB raw page: separate passes {before_s:.2f}s, peak {_peak_mb(_read_and_scan, path):.1f} MB; "
+              f"streamed scanner {after_s:.2f}s, peak {_peak_mb(scan_file, path):.1f} MB")
+    finally:
+        os.remove(path)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Separate regex passes vs the one-pass contact scanner over the saved pages")
+    parser.add_argument("-r", "--rounds", type=int, default=50)
+    parser.add_argument("--big-mb", type=float, default=8, help="Size of the synthetic multi-megabyte page")
+    args = parser.parse_args()
+    main(args.rounds, args.big_mb)
@@ -0,0 +1,49 @@
+import argparse
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from website_extractor import WebsiteDataExtractor
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+def _normalized(result):
+    # Emails, phones and social links come out of sets, so compare them order-independently
+    result = dict(result)
+    result['contact_info'] = {k: sorted(v) if isinstance(v, list) else v for k, v in result['contact_info'].items()}
+    result['social_media'] = {k: sorted(v) for k, v in result['social_media'].items()}
+    return result
+
+def _extract(extractor, url, html):
+    return extractor._assemble_result(url, extractor._parse_document(html), [])
+
+def _cpu_ms_per_page(extractor, url, html, rounds):
+    start = time.process_time()
+    for _ in range(rounds):
+        _extract(extractor, url, html)
+    return (time.process_time() - start) * 1000 / rounds
+
+def main(rounds):
+    before = WebsiteDataExtractor(single_pass=False)
+    after = WebsiteDataExtractor(single_pass=True)
+    if not after.single_pass:
+        print("lxml is not installed; the single-pass parser is unavailable.")
+        return
+    print(f"{'fixture':<28}{'size KB':>9}{'bs4 ms':>10}{'lxml ms':>10}{'speedup':>9}  same output")
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, '*.html'))):
+        with open(path, encoding='utf-8') as f:
+            html = f.read()
+        url = 'https://' + os.path.basename(path)
+        same = _normalized(_extract(before, url, html)) == _normalized(_extract(after, url, html))
+        before_ms = _cpu_ms_per_page(before, url, html, rounds)
+        after_ms = _cpu_ms_per_page(after, url, html, rounds)
+        print(f"{os.path.basename(path):<28}{len(html) / 1024:>9.1f}{before_ms:>10.2f}{after_ms:>10.2f}{before_ms / after_ms:>8.1f}x  {same}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-page CPU time of the BeautifulSoup and single-pass lxml extractors")
+    parser.add_argument("-r", "--rounds", type=int, default=50)
+    args = parser.parse_args()
+    main(args.rounds)
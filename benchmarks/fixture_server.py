@@ -0,0 +1,243 @@
+import argparse
+import hashlib
+import html
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+DEFAULT_SAMPLES_PATH = os.path.join(FIXTURES_DIR, 'samples.json')
+# The feed appends this many listings per scroll, like the Maps result list
+FEED_BATCH = 20
+
+def load_samples(path: str = DEFAULT_SAMPLES_PATH) -> List[Dict]:
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def place_href(index: int, sample: Dict) -> str:
+    # Same shape as a real listing link, including the data id that place_key() reads
+    slug = html.escape(sample['name'].replace(' ', '+'), quote=True)
+    return f"https://www.google.com/maps/place/{slug}/data=!4m7!3m6!1s0x{index:x}:0x{index:x}!8m2!3d0!4d0"
+
+def render_search(samples: List[Dict], count: int) -> str:
+    anchors = [
+        f'<div class="Nv2PK"><a class="hfpxzc" href="{place_href(index, samples[index % len(samples)])}" '
+        f'aria-label="{html.escape(samples[index % len(samples)]["name"])}"></a></div>'
+        for index in range(count)
+    ]
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Search - Google Maps</title></head>
+<body><div role="feed" style="height:800px;overflow-y:scroll"><div id="items"></div><div style="height:1200px"></div></div>
+<script>
+const items = {json.dumps(anchors)};
+let shown = 0;
+function more() {{
+    const end = Math.min(shown + {FEED_BATCH}, items.length);
+    document.getElementById('items').insertAdjacentHTML('beforeend', items.slice(shown, end).join(''));
+    shown = end;
+    if (shown >= items.length) {{
+        document.querySelector('div[role="feed"]').insertAdjacentHTML('beforeend', '<span class="HlvSq">You\\'ve reached the end of the list.</span>');
+    }}
+}}
+more();
+document.querySelector('div[role="feed"]').addEventListener('scroll', () => setTimeout(more, 50));
+</script></body></html>"""
+
+def render_place(sample: Dict, base_url: str, index: int) -> str:
+    rows = []
+    if sample.get('address'):
+        rows.append(f'<button data-item-id="address" class="CsEnBe"><div class="Io6YTe fontBodyMedium">{html.escape(sample["address"])}</div></button>')
+    if sample.get('opens_at'):
+        rows.append(f'<button data-item-id="oh" class="CsEnBe"><div class="Io6YTe fontBodyMedium">Closed ⋅ {html.escape(sample["opens_at"])}</div></button>')
+    if sample.get('has_website'):
+        rows.append(f'<a data-item-id="authority" href="{base_url}/site/{index}/" class="CsEnBe"><div class="Io6YTe fontBodyMedium">{base_url}/site/{index}/</div></a>')
+    if sample.get('phone'):
+        digits = ''.join(ch for ch in sample['phone'] if ch.isdigit() or ch == '+')
+        rows.append(f'<button data-item-id="phone:tel:{digits}" class="CsEnBe"><div class="Io6YTe fontBodyMedium">{html.escape(sample["phone"])}</div></button>')
+    rating = ''
+    if sample.get('rating') is not None:
+        rating = (f'<div class="F7nice "><span><span aria-hidden="true">{sample["rating"]}</span></span>'
+                  f'<span><span><span aria-label="{sample.get("reviews") or 0} reviews">({sample.get("reviews") or 0})</span></span></span></div>')
+    introduction = f'<div class="WeS02d fontBodyMedium"><div class="PYvSYb ">{html.escape(sample["introduction"])}</div></div>' if sample.get('introduction') else ''
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{html.escape(sample['name'])} - Google Maps</title></head>
+<body><div role="main" aria-label="{html.escape(sample['name'], quote=True)}">
+<div class="TIHn2 "><div class="tAiQdd"><div class="lMbq3e"><div><h1 class="DUwDvf lfPIob">{html.escape(sample['name'])}</h1></div>
+<div class="LBgpqf"><div class="skqShb"><span class="mgr77e"><span><button class="DkEaL ">{html.escape(sample.get('type') or '')}</button></span></span></div></div>
+<div class="fontBodyMedium dmRWX">{rating}</div></div></div></div>
+{introduction}
+<div class="E0DTEd"><div class="LTs0Rc" role="group"><div class="A5Tewb">In-store shopping</div></div>
+<div class="LTs0Rc" role="group"><div class="A5Tewb">Delivery</div></div></div>
+<div class="RcCsl">{''.join(rows)}</div>
+</div></body></html>"""
+
+def render_home(sample: Dict, index: int) -> str:
+    schema = f'<script type="application/ld+json">{json.dumps(sample["schema"])}</script>' if sample.get('schema') else ''
+    social = ''.join(f'<a href="{html.escape(link, quote=True)}">{network}</a> '
+                     for network, links in sample.get('social_media', {}).items() for link in links)
+    emails = ''.join(f'<p>Write to us: {html.escape(email)}</p>' for email in sample.get('emails', [])[:1])
+    paragraphs = ''.join(f'<p>{html.escape(sample["name"])} has served the neighbourhood with fresh products, '
+                         f'imported specialties and friendly service. Section {n} of our story.</p>' for n in range(40))
+    return f"""<!DOCTYPE html>
+<html lang="en"><head><meta charset="utf-8"><title>{html.escape(sample['name'])}</title>
+<meta name="description" content="{html.escape(sample.get('type') or 'Local business', quote=True)} in {html.escape(sample.get('address') or 'town', quote=True)}">
+<meta property="og:title" content="{html.escape(sample['name'], quote=True)}">
+{schema}<style>body{{font-family:sans-serif}}</style></head>
+<body><header><nav><a href="/site/{index}/">Home</a> <a href="/site/{index}/about">About</a> <a href="/site/{index}/contact">Contact Us</a></nav></header>
+<main>{paragraphs}{emails}
+<div class="hours">Opening hours: Mon-Sun 9:00 AM - 9:00 PM</div></main>
+<footer>{social}<p>{html.escape(sample.get('address') or '')}</p></footer></body></html>"""
+
+def render_contact(sample: Dict) -> str:
+    emails = ''.join(f'<p>Email <a href="mailto:{html.escape(email, quote=True)}">{html.escape(email)}</a></p>' for email in sample.get('emails', []))
+    phones = ''.join(f'<p>Call {html.escape(phone)}</p>' for phone in sample.get('phones', []) + ([sample['phone']] if sample.get('phone') else []))
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Contact - {html.escape(sample['name'])}</title></head>
+<body><main class="contact-page"><h1>Contact Us</h1>{emails}{phones}
+<form><label>Name <input name="name"></label><label>Message <textarea name="message"></textarea></label></form></main></body></html>"""
+
+def render_facebook(sample: Dict) -> str:
+    email = sample.get('facebook_email') or (sample.get('emails') or [None])[0]
+    intro = f'<div><span>{html.escape(email)}</span></div>' if email else '<div><span>No contact details</span></div>'
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{html.escape(sample['name'])} | Facebook</title></head>
+<body><div role="main"><h1>{html.escape(sample['name'])}</h1><div class="intro">{intro}</div></div>
+<div role="dialog"><p>See more from {html.escape(sample['name'])}</p><button aria-label="Close" onclick="this.parentNode.remove()">x</button></div>
+</body></html>"""
+
+# Serves Maps search and place pages, business homepages, contact pages and Facebook-like pages
+# rendered from samples. Every response waits `latency_ms` plus up to `jitter_ms`, and a
+# `failure_rate` share of them fail, half as HTTP 503 and half as a dropped connection. Pages
+# carry an ETag, and a request whose If-None-Match still matches gets an empty 304.
+class FixtureServer:
+    def __init__(self, samples: Optional[List[Dict]] = None, latency_ms: float = 50, jitter_ms: float = 25,
+                 failure_rate: float = 0.0, seed: int = 0, host: str = '127.0.0.1', port: int = 0):
+        self.samples = samples or load_samples()
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.random_lock = threading.Lock()
+        self.requests = 0
+        self.failures = 0
+        self.not_modified = 0
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self.base_url = f"http://{host}:{self.server.server_address[1]}"
+        self._thread = None
+
+    def sample(self, index: int) -> Dict:
+        return self.samples[index % len(self.samples)]
+
+    def search_url(self, count: int) -> str:
+        return f"{self.base_url}/maps/search?count={count}"
+
+    def place_url(self, index: int) -> str:
+        return f"{self.base_url}/maps/place/{index}"
+
+    def website_urls(self, count: int) -> List[str]:
+        return [f"{self.base_url}/site/{index}/" for index in range(count) if self.sample(index).get('has_website')]
+
+    def facebook_urls(self, count: int) -> List[str]:
+        return [f"{self.base_url}/facebook/{index}" for index in range(count)]
+
+    def _delay_and_fate(self):
+        with self.random_lock:
+            delay = (self.latency_ms + self.random.random() * self.jitter_ms) / 1000
+            roll = self.random.random()
+            self.requests += 1
+            if roll < self.failure_rate:
+                self.failures += 1
+        if roll < self.failure_rate:
+            return delay, 'drop' if roll < self.failure_rate / 2 else 'error'
+        return delay, None
+
+    def render(self, path: str, query: Dict) -> Optional[str]:
+        parts = [part for part in path.split('/') if part]
+        if parts[:2] == ['maps', 'search']:
+            return render_search(self.samples, int(query.get('count', ['100'])[0]))
+        if parts[:2] == ['maps', 'place'] and len(parts) >= 3:
+            # Routed real listing links carry the index in their data id
+            index = int(path.split('!1s0x')[1].split(':')[0], 16) if '!1s0x' in path else int(parts[2])
+            return render_place(self.sample(index), self.base_url, index)
+        if parts[:1] == ['site'] and len(parts) >= 2:
+            index = int(parts[1])
+            return render_contact(self.sample(index)) if len(parts) > 2 and parts[2] == 'contact' else render_home(self.sample(index), index)
+        if parts[:1] == ['facebook'] and len(parts) == 2:
+            return render_facebook(self.sample(int(parts[1])))
+        return None
+
+    def _handler_class(self):
+        fixture = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                delay, fate = fixture._delay_and_fate()
+                time.sleep(delay)
+                if fate == 'drop':
+                    self.close_connection = True
+                    self.connection.close()
+                    return
+                parsed = urlparse(self.path)
+                try:
+                    body = fixture.render(parsed.path, parse_qs(parsed.query))
+                except (ValueError, IndexError):
+                    body = None
+                status = 503 if fate == 'error' else 200 if body is not None else 404
+                payload = (body if status == 200 else 'unavailable').encode('utf-8')
+                etag = f'"{hashlib.sha1(payload).hexdigest()[:16]}"'
+                if status == 200 and self.headers.get('If-None-Match') == etag:
+                    with fixture.random_lock:
+                        fixture.not_modified += 1
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                if status == 200:
+                    self.send_header('ETag', etag)
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> 'FixtureServer':
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve Maps, website and Facebook fixture pages locally")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--samples", type=str, default=DEFAULT_SAMPLES_PATH)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--jitter-ms", type=float, default=25)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = FixtureServer(load_samples(args.samples), args.latency_ms, args.jitter_ms, args.failure_rate, port=args.port)
+    print(f"Serving on {server.base_url}: /maps/search?count=N, /maps/place/<i>, /site/<i>/, /site/<i>/contact, /facebook/<i>")
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
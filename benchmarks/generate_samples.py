@@ -0,0 +1,65 @@
+import argparse
+import json
+import math
+import os
+import sys
+
+import pandas as pd
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+DEFAULT_SAMPLES_PATH = os.path.join(FIXTURES_DIR, 'samples.json')
+
+def _value(row, column):
+    value = row.get(column)
+    if value is None or (isinstance(value, float) and math.isnan(value)) or value in ('N/A', 'None Found', ''):
+        return None
+    return value
+
+def _split(value):
+    return [part for part in (value or '').split(', ') if part and part != 'N/A']
+
+# One sample per scraped place: the Maps panel fields from the CSV and the website contact data
+# from the detailed JSON, which is all the fixture server needs to render believable pages
+def build_samples(csv_path: str, json_path: str):
+    df = pd.read_csv(csv_path)
+    with open(json_path, encoding='utf-8') as f:
+        details = {entry['url']: entry for entry in json.load(f) if entry.get('url')}
+    samples = []
+    for _, row in df.iterrows():
+        website = _value(row, 'Website')
+        detail = details.get(website, {})
+        contact = detail.get('contact_info', {})
+        social = detail.get('social_media', {})
+        emails = [email for email in contact.get('emails', []) if email] or _split(_value(row, 'Email'))
+        samples.append({
+            'name': row['Names'],
+            'type': _value(row, 'Type'),
+            'introduction': _value(row, 'Introduction'),
+            'address': _value(row, 'Address'),
+            'phone': _value(row, 'Phone Number'),
+            'rating': _value(row, 'Average Review Count'),
+            'reviews': int(row['Review Count']) if _value(row, 'Review Count') is not None else None,
+            'opens_at': (_value(row, 'Opens At') or '').strip() or None,
+            'has_website': website is not None,
+            'emails': emails,
+            'phones': [phone for phone in contact.get('phones', []) if phone.strip()] or _split(_value(row, 'Additional_Phones')),
+            'social_media': {network: links for network, links in social.items() if links},
+            'facebook_email': _value(row, 'email_1'),
+            'schema': detail.get('structured_data') or None,
+        })
+    return samples
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build fixture-server samples from a scraper run's CSV and detailed JSON")
+    parser.add_argument("--csv", type=str, default=os.path.join(ROOT_DIR, 'business_data.csv'))
+    parser.add_argument("--json", type=str, default=os.path.join(ROOT_DIR, 'detailed_business_data.json'))
+    parser.add_argument("-o", "--output", type=str, default=DEFAULT_SAMPLES_PATH)
+    args = parser.parse_args()
+
+    samples = build_samples(args.csv, args.json)
+    if not samples:
+        sys.exit("No rows in the CSV")
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(samples, f, indent=2, ensure_ascii=False)
+    print(f"Wrote {len(samples)} samples to {args.output}")
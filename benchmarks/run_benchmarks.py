@@ -0,0 +1,172 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from playwright.async_api import async_playwright
+
+from async_browser import map_pages, run_async
+from browser_profile import launch_browser
+from facebook_emails import extract_facebook_emails
+from http_cache import HttpCache
+from place_details import place_failed, scrape_place, null_record
+from rate_limiter import limiter
+from results_feed import scroll_feed_async
+from run_metrics import metrics
+from website_extractor import AsyncWebsiteDataExtractor, WebsiteDataExtractor
+from fixture_server import DEFAULT_SAMPLES_PATH, FixtureServer, load_samples
+
+STAGES = ('websites_sync', 'websites_async', 'websites_revalidate', 'discovery', 'place_details', 'facebook')
+# Which latency histogram of run_metrics belongs to which stage
+STAGE_HISTOGRAMS = {
+    'websites_sync': 'website_fetch_seconds',
+    'websites_async': 'website_fetch_seconds',
+    'websites_revalidate': 'website_fetch_seconds',
+    'place_details': 'place_detail_seconds',
+    'facebook': 'facebook_page_seconds',
+}
+
+def route_maps_to(server: FixtureServer):
+    # Listing links are absolute google.com URLs; answer them from the fixture server instead
+    async def handle(route):
+        try:
+            response = await route.fetch(url=route.request.url.replace('https://www.google.com', server.base_url))
+            await route.fulfill(response=response)
+        except Exception:
+            await route.abort()
+
+    async def setup(page):
+        await page.route('https://www.google.com/maps/**', handle)
+    return setup
+
+async def _discover(server: FixtureServer, places: int):
+    async with async_playwright() as p:
+        browser = await launch_browser(p, fast=True)
+        try:
+            page = await browser.new_page()
+            await route_maps_to(server)(page)
+            await page.goto(server.search_url(places).replace(server.base_url, 'https://www.google.com'))
+            hrefs, _ = await scroll_feed_async(page, places, min_idle_ms=200, max_idle_ms=2000)
+            return hrefs
+        finally:
+            await browser.close()
+
+async def _place_details(server: FixtureServer, hrefs, workers: int):
+    async with async_playwright() as p:
+        browser = await launch_browser(p, fast=True)
+        try:
+            return await map_pages(browser, hrefs, scrape_place, workers, 45, place_failed,
+                                   setup_page=route_maps_to(server), desc="Place details")
+        finally:
+            await browser.close()
+
+def _filled_cache(server: FixtureServer, args, cache_dir: str):
+    # Entries are stale as soon as they are written, so every later fetch revalidates with If-None-Match
+    extractor = AsyncWebsiteDataExtractor(concurrency=args.concurrency, per_host=args.per_host, cache=HttpCache(cache_dir, ttl=0))
+    return extractor, extractor.extract_all(server.website_urls(args.places), desc="Websites (filling the cache)")
+
+def run_stage(name: str, server: FixtureServer, args):
+    if name == 'websites_revalidate':
+        cache_dir = tempfile.TemporaryDirectory()
+        extractor, first_pass = _filled_cache(server, args, cache_dir.name)
+    metrics.reset()
+    requests_before, failures_before, not_modified_before = server.requests, server.failures, server.not_modified
+    started = time.perf_counter()
+    if name == 'websites_sync':
+        extractor = WebsiteDataExtractor()
+        results = [extractor.extract_structured_data(url) for url in server.website_urls(args.sync_sites)]
+        found = sum(1 for result in results if result['contact_info']['emails'])
+    elif name == 'websites_async':
+        extractor = AsyncWebsiteDataExtractor(concurrency=args.concurrency, per_host=args.per_host)
+        results = extractor.extract_all(server.website_urls(args.places), desc="Websites")
+        found = sum(1 for result in results if result['contact_info']['emails'])
+    elif name == 'websites_revalidate':
+        results = extractor.extract_all(server.website_urls(args.places), desc="Websites (revalidating)")
+        found = sum(1 for result in results if result['contact_info']['emails'])
+        cache_dir.cleanup()
+    elif name == 'discovery':
+        results = run_async(_discover(server, args.places))
+        found = len(results)
+    elif name == 'place_details':
+        hrefs = [server.place_url(index) for index in range(args.places)]
+        hrefs = [href.replace(server.base_url, 'https://www.google.com') for href in hrefs]
+        results = run_async(_place_details(server, hrefs, args.workers))
+        found = sum(1 for result in results if result != null_record())
+    else:
+        emails = extract_facebook_emails(server.facebook_urls(args.places), workers=args.workers, fast=True)
+        results = list(emails.values())
+        found = sum(1 for email in results if email != 'N/A')
+    seconds = time.perf_counter() - started
+    # Per-host histograms are merged; every fixture site is on the same host anyway
+    latencies = [value for histogram in metrics.histograms.get(STAGE_HISTOGRAMS.get(name), {}).values()
+                 for value in histogram.values]
+    return {
+        'items': len(results),
+        'with_data': found,
+        'seconds': round(seconds, 3),
+        'items_per_second': round(len(results) / seconds, 2) if seconds else None,
+        'latency': _summary(latencies) if latencies else {},
+        'errors': metrics.report()['errors'],
+        'server_requests': server.requests - requests_before,
+        'server_failures': server.failures - failures_before,
+        'server_not_modified': server.not_modified - not_modified_before,
+        **({'matches_first_pass': results == first_pass} if name == 'websites_revalidate' else {}),
+    }
+
+def _summary(values):
+    ordered = sorted(values)
+    pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 4)
+    return {'count': len(ordered), 'p50': pick(0.5), 'p90': pick(0.9), 'p99': pick(0.99), 'max': round(ordered[-1], 4)}
+
+def main(args):
+    stages = [stage.strip() for stage in args.stages.split(',')] if args.stages else list(STAGES)
+    results = {}
+    limiter.configure(initial_rate=args.host_rate, max_rate=args.host_rate, burst=args.host_rate)
+    with FixtureServer(load_samples(args.samples), args.latency_ms, args.jitter_ms, args.failure_rate, seed=args.seed) as server:
+        print(f"Fixture server on {server.base_url}: {args.latency_ms} ms + up to {args.jitter_ms} ms, failure rate {args.failure_rate}")
+        for stage in stages:
+            try:
+                results[stage] = run_stage(stage, server, args)
+            except Exception as e:
+                # Browser stages need a Playwright Chromium install; report them as skipped without one
+                reason = str(e).splitlines()[0] if str(e) else type(e).__name__
+                print(f"{stage}: skipped ({reason})")
+                results[stage] = {'skipped': reason}
+
+    print(f"\n{'stage':<20}{'items':>7}{'with data':>11}{'seconds':>9}{'items/s':>9}{'p50 s':>8}{'p90 s':>8}{'fails':>7}")
+    for stage, result in results.items():
+        if 'skipped' in result:
+            print(f"{stage:<20}{'skipped':>7}")
+            continue
+        latency = result['latency']
+        print(f"{stage:<20}{result['items']:>7}{result['with_data']:>11}{result['seconds']:>9.2f}{result['items_per_second'] or 0:>9.1f}"
+              f"{latency.get('p50', 0):>8.3f}{latency.get('p90', 0):>8.3f}{result['server_failures']:>7}")
+    if 'matches_first_pass' in results.get('websites_revalidate', {}):
+        result = results['websites_revalidate']
+        print(f"\nwebsites_revalidate: {result['server_not_modified']} of {result['server_requests']} requests answered 304, "
+              f"results {'match' if result['matches_first_pass'] else 'DIFFER FROM'} the first pass")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'settings': vars(args), 'stages': results}, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the scraper stages against a local fixture server, without network access")
+    parser.add_argument("--stages", type=str, help=f"Comma-separated subset of {', '.join(STAGES)}")
+    parser.add_argument("--places", type=int, default=100, help="Listings, websites and Facebook pages per stage")
+    parser.add_argument("--sync-sites", type=int, default=30, help="Websites for the sequential extractor")
+    parser.add_argument("--workers", type=int, default=4, help="Browser pages for the place details and Facebook stages")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--per-host", type=int, default=20, help="Every fixture site shares one host, so this usually equals --concurrency")
+    parser.add_argument("--host-rate", type=float, default=1000, help="Requests/s the rate limiter allows the fixture host; lower it to measure the limiter itself")
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--jitter-ms", type=float, default=25)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--samples", type=str, default=DEFAULT_SAMPLES_PATH)
+    parser.add_argument("-o", "--output", type=str, help="Write the results as JSON to this file")
+    main(parser.parse_args())
@@ -0,0 +1,102 @@
+import json
+from collections import Counter
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+DEFAULT_BLOCK_CONFIG = {
+    # Playwright resource types that no extractor reads
+    'resource_types': ['image', 'media', 'font'],
+    # URL fragments of Maps tiles, imagery and logging beacons, which are fetched as XHR/fetch rather than as images
+    'url_patterns': ['/maps/vt', '/kh/v=', 'khms', 'streetviewpixels', '/maps/preview/log', '/gen_204'],
+    # Analytics, ads and tracking hosts (subdomains included)
+    'domains': [
+        'google-analytics.com', 'googletagmanager.com', 'doubleclick.net', 'googlesyndication.com',
+        'googleadservices.com', 'adservice.google.com', 'connect.facebook.net', 'hotjar.com',
+        'clarity.ms', 'segment.io', 'mixpanel.com', 'newrelic.com', 'nr-data.net', 'optimizely.com',
+    ],
+}
+
+def load_block_config(path: Optional[str] = None) -> Dict:
+    config = {key: list(values) for key, values in DEFAULT_BLOCK_CONFIG.items()}
+    if path:
+        # A JSON file with any of the three keys replaces that list of the defaults
+        with open(path, encoding='utf-8') as f:
+            overrides = json.load(f)
+        for key in config:
+            if key in overrides:
+                config[key] = list(overrides[key])
+    return config
+
+# Aborts requests for resources the scrapers never read and counts what it blocked. Loaded
+# bytes come from the Content-Length of allowed responses; aborted requests never download,
+# so blocked traffic is reported as a request count per reason.
+class ResourceBlocker:
+    def __init__(self, config: Optional[Dict] = None):
+        config = config or load_block_config()
+        self.resource_types = set(config['resource_types'])
+        self.url_patterns = tuple(config['url_patterns'])
+        self.domains = tuple(config['domains'])
+        self.blocked = Counter()
+        self.allowed_requests = 0
+        self.loaded_bytes = 0
+
+    def block_reason(self, url: str, resource_type: str) -> Optional[str]:
+        if resource_type in self.resource_types:
+            return resource_type
+        host = urlparse(url).hostname or ''
+        for domain in self.domains:
+            if host == domain or host.endswith('.' + domain):
+                return 'tracker'
+        for pattern in self.url_patterns:
+            if pattern in url:
+                return 'url pattern'
+        return None
+
+    def _route_decision(self, route) -> bool:
+        request = route.request
+        reason = self.block_reason(request.url, request.resource_type)
+        if reason:
+            self.blocked[reason] += 1
+            return True
+        self.allowed_requests += 1
+        return False
+
+    def _count_response(self, response):
+        try:
+            self.loaded_bytes += int(response.headers.get('content-length', 0))
+        except ValueError:
+            pass
+
+    def handle_route(self, route):
+        if self._route_decision(route):
+            route.abort()
+        else:
+            route.continue_()
+
+    async def handle_route_async(self, route):
+        if self._route_decision(route):
+            await route.abort()
+        else:
+            await route.continue_()
+
+    def install(self, page):
+        page.route("**/*", self.handle_route)
+        page.on("response", self._count_response)
+
+    async def install_async(self, page):
+        await page.route("**/*", self.handle_route_async)
+        page.on("response", self._count_response)
+
+    def report(self) -> str:
+        blocked = sum(self.blocked.values())
+        by_reason = ', '.join(f"{reason}: {count}" for reason, count in self.blocked.most_common())
+        return (f"Blocked {blocked} requests ({by_reason or 'none'}); "
+                f"allowed {self.allowed_requests} requests, {self.loaded_bytes / 1024 / 1024:.1f} MB loaded")
+
+FAST_LAUNCH_ARGS = ['--disable-gpu', '--disable-extensions', '--mute-audio', '--blink-settings=imagesEnabled=false']
+
+# Works with both Playwright APIs; with async_playwright the result has to be awaited
+def launch_browser(p, fast: bool = False):
+    if fast:
+        return p.chromium.launch(headless=True, args=FAST_LAUNCH_ARGS)
+    return p.chromium.launch(headless=False)
@@ -0,0 +1,212 @@
+import argparse
+import json
+import os
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+FORMATS = ('csv', 'parquet', 'arrow')
+EXTENSIONS = {'parquet': '.parquet', 'arrow': '.arrow'}
+SOCIAL_NETWORKS = ('facebook', 'instagram', 'twitter', 'linkedin', 'youtube')
+
+def is_available() -> bool:
+    return pa is not None
+
+def parse_formats(text: str) -> List[str]:
+    formats = [name.strip().lower() for name in text.split(',') if name.strip()]
+    unknown = [name for name in formats if name not in FORMATS]
+    if unknown:
+        raise ValueError(f"Unknown output format(s) {', '.join(unknown)}; choose from {', '.join(FORMATS)}")
+    if any(name != 'csv' for name in formats) and not is_available():
+        raise ValueError("Parquet and Arrow output need pyarrow (pip install pyarrow)")
+    return formats
+
+def output_path(path: str, fmt: str) -> str:
+    return os.path.splitext(path)[0] + EXTENSIONS[fmt]
+
+def business_schema():
+    string_list = pa.list_(pa.string())
+    return pa.schema([
+        ('Names', pa.string()),
+        ('Website', pa.string()),
+        ('Introduction', pa.string()),
+        ('Phone Number', pa.string()),
+        ('Address', pa.string()),
+        ('Review Count', pa.int64()),
+        ('Average Review Count', pa.float64()),
+        ('Store Shopping', pa.bool_()),
+        ('In Store Pickup', pa.bool_()),
+        ('Delivery', pa.bool_()),
+        ('Type', pa.string()),
+        ('Opens At', pa.string()),
+        ('Email', pa.string()),
+        ('Emails', string_list),
+        ('Phones', string_list),
+        ('Facebook', string_list),
+        ('Instagram', string_list),
+        ('Twitter', string_list),
+        ('Linkedin', string_list),
+        ('Youtube', string_list),
+        ('Business_Hours', pa.string()),
+        ('Street', pa.string()),
+        ('City', pa.string()),
+        ('State', pa.string()),
+        ('Postal Code', pa.string()),
+        ('email_1', pa.string()),
+        ('email_2', pa.string()),
+        ('search_query', pa.string()),
+    ])
+
+def website_schema():
+    string_list = pa.list_(pa.string())
+    return pa.schema([
+        ('url', pa.string()),
+        ('contact_info', pa.struct([('emails', string_list), ('phones', string_list), ('address', pa.string())])),
+        ('social_media', pa.struct([(network, string_list) for network in SOCIAL_NETWORKS])),
+        ('meta_data', pa.map_(pa.string(), pa.string())),
+        ('business_hours', pa.string()),
+        ('additional_info', pa.struct([('price_range', pa.string()), ('cuisine', pa.string())])),
+        # schema.org JSON-LD has no fixed shape, so it stays a JSON document per row
+        ('structured_data', pa.string()),
+    ])
+
+def website_row(data: Dict) -> Dict:
+    contact = data.get('contact_info') or {}
+    social = data.get('social_media') or {}
+    additional = data.get('additional_info') or {}
+    return {
+        'url': data.get('url'),
+        'contact_info': {
+            'emails': list(contact.get('emails') or []),
+            'phones': [phone for phone in contact.get('phones') or [] if phone],
+            'address': contact.get('address'),
+        },
+        'social_media': {network: list(social.get(network) or []) for network in SOCIAL_NETWORKS},
+        'meta_data': {str(key): str(value) for key, value in (data.get('meta_data') or {}).items()},
+        'business_hours': json.dumps(data['business_hours'], ensure_ascii=False) if data.get('business_hours') else None,
+        'additional_info': {
+            'price_range': additional.get('price_range'),
+            'cuisine': json.dumps(additional['cuisine'], ensure_ascii=False) if isinstance(additional.get('cuisine'), list) else additional.get('cuisine'),
+        },
+        'structured_data': json.dumps(data['structured_data'], ensure_ascii=False) if data.get('structured_data') else None,
+    }
+
+def _string_column(values: pd.Series) -> pd.Series:
+    values = values.astype(object)
+    return values.where(values.notna() & (values != 'N/A'), None)
+
+def _list_column(values: pd.Series) -> List[List[str]]:
+    # The CSV joins lists with ', ' and writes 'N/A' for none
+    return [[] if not isinstance(value, str) or value == 'N/A' else [part for part in value.split(', ') if part]
+            for value in values]
+
+def business_table(df: pd.DataFrame, emails: Optional[List[List[str]]] = None):
+    schema = business_schema()
+    columns = {}
+    for field in schema:
+        source = 'Additional_Phones' if field.name == 'Phones' else field.name
+        if field.name == 'Emails' and emails is not None:
+            columns[field.name] = [list(values) for values in emails]
+        elif source not in df.columns:
+            # Columns with a single value are dropped from the CSV; here they stay, empty
+            columns[field.name] = [[] if pa.types.is_list(field.type) else None for _ in range(len(df))]
+        elif pa.types.is_list(field.type):
+            columns[field.name] = _list_column(df[source])
+        elif pa.types.is_boolean(field.type):
+            columns[field.name] = [{'Yes': True, 'No': False}.get(value) for value in df[source]]
+        elif pa.types.is_integer(field.type) or pa.types.is_floating(field.type):
+            numbers = pd.to_numeric(df[source], errors='coerce')
+            columns[field.name] = [None if pd.isna(value) else value for value in numbers.tolist()]
+        else:
+            columns[field.name] = _string_column(df[source]).tolist()
+    return pa.Table.from_pydict(columns, schema=schema)
+
+# Appends records to a Parquet file (one row group per `rows_per_group` records) or an Arrow IPC
+# file (one record batch each) under a fixed schema. Rows are buffered only until their group is
+# full, and the file is moved into place on close, so readers never see a partial file.
+class StreamingTableWriter:
+    def __init__(self, path: str, schema, fmt: str = 'parquet', rows_per_group: int = 1000):
+        self.path = path
+        self.schema = schema
+        self.fmt = fmt
+        self.rows_per_group = rows_per_group
+        self.rows_written = 0
+        self._rows = []
+        self._tmp_path = path + '.tmp'
+        if fmt == 'parquet':
+            self._writer = pq.ParquetWriter(self._tmp_path, schema, compression='zstd')
+        elif fmt == 'arrow':
+            self._sink = pa.OSFile(self._tmp_path, 'wb')
+            self._writer = pa.ipc.new_file(self._sink, schema)
+        else:
+            raise ValueError(f"Unsupported columnar format {fmt!r}")
+
+    def write(self, row: Dict):
+        self._rows.append(row)
+        if len(self._rows) >= self.rows_per_group:
+            self.flush()
+
+    def write_table(self, table):
+        self.flush()
+        for batch in table.to_batches(max_chunksize=self.rows_per_group):
+            self._write_batch(batch)
+
+    def flush(self):
+        if self._rows:
+            self._write_batch(pa.RecordBatch.from_pylist(self._rows, schema=self.schema))
+            self._rows = []
+
+    def _write_batch(self, batch):
+        if self.fmt == 'parquet':
+            self._writer.write_batch(batch, row_group_size=self.rows_per_group)
+        else:
+            self._writer.write_batch(batch)
+        self.rows_written += batch.num_rows
+
+    def close(self):
+        self.flush()
+        self._writer.close()
+        if self.fmt == 'arrow':
+            self._sink.close()
+        os.replace(self._tmp_path, self.path)
+
+def write_website_records(records: Iterable[Dict], path: str, fmt: str, rows_per_group: int = 1000) -> int:
+    writer = StreamingTableWriter(path, website_schema(), fmt, rows_per_group)
+    for record in records:
+        writer.write(website_row(record))
+    writer.close()
+    return writer.rows_written
+
+def write_business_rows(df: pd.DataFrame, path: str, fmt: str, emails: Optional[List[List[str]]] = None,
+                        rows_per_group: int = 1000) -> int:
+    writer = StreamingTableWriter(path, business_schema(), fmt, rows_per_group)
+    for start in range(0, len(df), rows_per_group):
+        chunk_emails = emails[start:start + rows_per_group] if emails is not None else None
+        writer.write_table(business_table(df.iloc[start:start + rows_per_group], chunk_emails))
+    writer.close()
+    return writer.rows_written
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert an existing business_data.csv and detailed_business_data.json to Parquet or Arrow")
+    parser.add_argument("--csv", type=str, default='business_data.csv')
+    parser.add_argument("--json", type=str, default='detailed_business_data.json')
+    parser.add_argument("--format", type=str, choices=['parquet', 'arrow'], default='parquet')
+    args = parser.parse_args()
+
+    parse_formats(args.format)
+    if os.path.exists(args.csv):
+        df = pd.read_csv(args.csv, dtype=str, keep_default_na=False)
+        rows = write_business_rows(df, output_path(args.csv, args.format), args.format)
+        print(f"Wrote {rows} rows to {output_path(args.csv, args.format)}")
+    if os.path.exists(args.json):
+        with open(args.json, encoding='utf-8') as f:
+            records = json.load(f)
+        rows = write_website_records(records, output_path(args.json, args.format), args.format)
+        print(f"Wrote {rows} rows to {output_path(args.json, args.format)}")
@@ -0,0 +1,156 @@
+import argparse
+import json
+import re
+from typing import Dict, Iterable, Iterator, Optional, Union
+from urllib.parse import unquote
+
+SOCIAL_PLATFORMS = ('facebook', 'instagram', 'twitter', 'linkedin', 'youtube')
+# Retina asset names such as logo@2x.png look like addresses
+ASSET_SUFFIXES = ('.png', '.jpg', '.jpeg', '.gif', '.webp', '.svg')
+MAX_EMAIL_LENGTH = 100
+CHUNK_SIZE = 1 << 20
+# A window is cut at its last '>' or newline; one without them is cut this far from its end
+MAX_CARRY = 4096
+
+_PLATFORMS = '|'.join(SOCIAL_PLATFORMS)
+_LOCAL = r"[A-Za-z0-9._%+-]{1,64}"
+_DOMAIN = r"[A-Za-z0-9.-]{1,190}\.[A-Za-z]{2,24}"
+_OBFUSCATED_AT = r"[ \t]*[\[({][ \t]*(?i:at)[ \t]*[\])}][ \t]*"
+_OBFUSCATED_DOT = r"[ \t]*[\[({][ \t]*(?i:dot)[ \t]*[\])}][ \t]*"
+
+_PHONE_TAIL = r"\)?[-.\ ]{0,2}\d{3}[-.\ ]{0,2}\d{4}(?!\d)"
+
+# Everything the scanner looks for, as alternatives of one pattern so a page is read once.
+# Every match starts by consuming one character outside [A-Za-z_%-], so re skips runs of
+# letters in C instead of trying the alternatives inside every word. Lookbehinds then decide
+# what may follow that character: emails, links and handles need it to be a non-address
+# character (so 'Email—info@shop.com' matches), while a phone starts on it, as long as no digit
+# or '+' precedes it (so 'Tel416-555-1234' matches). Bounded repetitions keep every match
+# shorter than MAX_CARRY.
+CONTACT_SOURCE = rf"""
+[^A-Za-z_%-]
+(?:
+    (?<![\d+.])(?i:mailto):(?P<mailto>[^\s"'<>?]{{3,320}})
+  | (?<![\d+.])(?i:tel):(?P<tel>[+\d().\ /-]{{7,32}})
+  | (?<![\d+.])(?P<local>{_LOCAL})(?:
+        (?:@|&\#0*64;|&\#x0*40;|%40)(?P<domain>{_DOMAIN})
+      | {_OBFUSCATED_AT}(?P<obfuscated>[A-Za-z0-9-]{{1,63}}(?:(?:{_OBFUSCATED_DOT}|\.)[A-Za-z0-9-]{{1,63}}){{1,4}})
+    )
+  | (?<!\d)(?P<social>(?P<platform>(?i:{_PLATFORMS}))\.com/[A-Za-z0-9_.]{{1,100}})
+  | (?<![\d+].)(?P<phone>
+        (?<=\+)\d{{1,3}}[-.\ ]?\(?\d{{3}}{_PHONE_TAIL}
+      | (?<=\()\d{{3}}{_PHONE_TAIL}
+      | (?<=\d)\d{{2}}{_PHONE_TAIL}
+    )
+)
+"""
+CONTACT_PATTERN = re.compile(CONTACT_SOURCE, re.X)
+CONTACT_BYTES_PATTERN = re.compile(CONTACT_SOURCE.encode(), re.X)
+EMAIL_PATTERN = re.compile(rf"(?<![A-Za-z0-9._%+-]){_LOCAL}@{_DOMAIN}")
+SOCIAL_PATTERN = re.compile(rf"(?P<platform>{_PLATFORMS})\.com/[A-Za-z0-9_.]", re.I)
+OBFUSCATED_DOT_PATTERN = re.compile(_OBFUSCATED_DOT)
+
+def _text(value: Union[str, bytes]) -> str:
+    return value.decode('utf-8', 'ignore') if isinstance(value, bytes) else value
+
+def usable_email(email: str) -> bool:
+    return len(email) < MAX_EMAIL_LENGTH and not email.lower().endswith(ASSET_SUFFIXES)
+
+# Emails, phones and social handles of one page (or several), in first-seen order without repeats
+class ContactScan:
+    def __init__(self):
+        self.emails = {}
+        self.phones = {}
+        self.social = {platform: {} for platform in SOCIAL_PLATFORMS}
+
+    def add_email(self, email: str):
+        if usable_email(email):
+            self.emails[email] = None
+
+    def add_phone(self, phone: str):
+        phone = ' '.join(phone.split())
+        if phone:
+            self.phones[phone] = None
+
+    def add_match(self, match):
+        kind = match.lastgroup
+        if kind in ('domain', 'obfuscated'):
+            # lastgroup names the innermost group that closed last
+            domain = _text(match.group(kind))
+            if kind == 'obfuscated':
+                domain = OBFUSCATED_DOT_PATTERN.sub('.', domain)
+            self.add_email(_text(match.group('local')) + '@' + domain)
+            return
+        value = _text(match.group(kind))
+        if kind == 'phone':
+            # The phone's first character is the one the match starts on, outside the group
+            self.add_phone(_text(match.group(0)))
+        elif kind == 'social':
+            self.social[_text(match.group('platform')).lower()][value] = None
+        elif kind == 'mailto':
+            for address in unquote(value).split(','):
+                if EMAIL_PATTERN.fullmatch(address.strip()):
+                    self.add_email(address.strip())
+        elif kind == 'tel':
+            self.add_phone(unquote(value))
+
+    def to_dict(self) -> Dict:
+        return {
+            'emails': list(self.emails),
+            'phones': list(self.phones),
+            'social_media': {platform: list(handles) for platform, handles in self.social.items() if handles},
+        }
+
+def _windows(chunks: Iterable[Union[str, bytes]]) -> Iterator[Union[str, bytes]]:
+    # Re-slices a stream into windows that each start on a '>' or newline (which no match can
+    # contain), so a match is never split and always has a character to start on
+    carry = None
+    for chunk in chunks:
+        newline, close = ('\n', '>') if isinstance(chunk, str) else (b'\n', b'>')
+        buffer = newline + chunk if carry is None else carry + chunk
+        cut = max(buffer.rfind(newline), buffer.rfind(close))
+        if cut < len(buffer) - MAX_CARRY:
+            cut = len(buffer) - MAX_CARRY
+        if cut > 0:
+            yield buffer[:cut]
+        carry = buffer[max(cut, 0):]
+    if carry:
+        yield carry
+
+# One pass over a stream of str or bytes chunks; memory stays around one chunk however long it is
+def scan_chunks(chunks: Iterable[Union[str, bytes]], into: Optional[ContactScan] = None) -> ContactScan:
+    found = into if into is not None else ContactScan()
+    for window in _windows(chunks):
+        pattern = CONTACT_BYTES_PATTERN if isinstance(window, bytes) else CONTACT_PATTERN
+        for match in pattern.finditer(window):
+            found.add_match(match)
+    return found
+
+def scan(data: Union[str, bytes], into: Optional[ContactScan] = None, chunk_size: int = CHUNK_SIZE) -> ContactScan:
+    return scan_chunks((data[start:start + chunk_size] for start in range(0, len(data), chunk_size)), into)
+
+def scan_file(path: str, chunk_size: int = CHUNK_SIZE) -> ContactScan:
+    with open(path, 'rb') as f:
+        return scan_chunks(iter(lambda: f.read(chunk_size), b''))
+
+# Adds the addresses and numbers behind the mailto:/tel: links among `hrefs`
+def scan_contact_links(hrefs: Iterable[str], into: Optional[ContactScan] = None) -> ContactScan:
+    links = [href for href in hrefs if href[:7].lower() == 'mailto:' or href[:4].lower() == 'tel:']
+    return scan('\n'.join(links), into)
+
+def social_platform(href: str) -> Optional[str]:
+    match = SOCIAL_PATTERN.search(href)
+    return match.group('platform').lower() if match else None
+
+def first_email(text: str) -> Optional[str]:
+    for match in EMAIL_PATTERN.finditer(text):
+        if usable_email(match.group(0)):
+            return match.group(0)
+    return None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print the emails, phones and social handles found in saved pages")
+    parser.add_argument("paths", nargs='+')
+    args = parser.parse_args()
+    for path in args.paths:
+        print(json.dumps({'path': path, **scan_file(path).to_dict()}, indent=2, ensure_ascii=False))
@@ -0,0 +1,95 @@
+import time
+from typing import Callable, Dict, List, Optional
+
+from playwright.async_api import async_playwright
+
+from async_browser import map_pages, run_async
+from browser_profile import ResourceBlocker, launch_browser
+from contact_scanner import first_email
+from rate_limiter import limiter
+from result_cache import ResultCache
+from run_metrics import metrics
+
+DIALOG_SELECTOR = 'div[role="dialog"]'
+CLOSE_BUTTON_SELECTOR = 'div[role="dialog"] button[aria-label="Close"]'
+DEFAULT_CACHE_PATH = '.facebook_cache.sqlite'
+
+# Resolves once the page shows an email-like string or the login dialog, whichever comes first
+READY_JS = """
+() => {
+    const text = document.body ? document.body.innerText : '';
+    return text.includes('@') || document.querySelector('div[role="dialog"]') !== null;
+}
+"""
+
+async def fetch_facebook_email(page, link: str) -> str:
+    started = time.perf_counter()
+    await limiter.goto_async(page, link, timeout=60000, wait_until='domcontentloaded')
+    try:
+        await page.wait_for_function(READY_JS, timeout=8000)
+    except Exception:
+        pass
+    if await page.locator(DIALOG_SELECTOR).count() > 0:
+        close_button = page.locator(CLOSE_BUTTON_SELECTOR)
+        if await close_button.count() > 0:
+            try:
+                await close_button.first.click(timeout=3000)
+                await page.locator(DIALOG_SELECTOR).first.wait_for(state='detached', timeout=3000)
+            except Exception as popup_error:
+                print(f"Error closing popup on {link}: {popup_error}")
+        else:
+            print(f"Close button not found on {link}")
+    email = first_email(await page.content())
+    metrics.observe('facebook_page_seconds', time.perf_counter() - started)
+    if not email:
+        print(f"No email found on {link}")
+    return email or 'N/A'
+
+def facebook_link_failed(link: str, error: Exception) -> Optional[str]:
+    print(f"Error navigating to {link}: {str(error) or type(error).__name__}")
+    metrics.count_error('facebook', error)
+    return None
+
+async def _extract_async(links: List[str], workers: int, timeout: float, fast: bool,
+                         blocker: Optional[ResourceBlocker], on_result) -> List[Optional[str]]:
+    async with async_playwright() as p:
+        browser = await launch_browser(p, fast)
+        try:
+            return await map_pages(
+                browser, links, fetch_facebook_email, workers, timeout, facebook_link_failed,
+                setup_page=blocker.install_async if blocker else None,
+                desc="Extracting Facebook Emails", on_result=on_result
+            )
+        finally:
+            await browser.close()
+
+# Visits every unique link once over a pool of pages; 'N/A' means the page had no email.
+# Results (including 'N/A') are kept in `cache` until its TTL expires, while links that fail
+# to load are left out so the next run tries them again.
+def extract_facebook_emails(links: List[str], workers: int = 4, timeout: float = 60, fast: bool = False,
+                            cache: Optional[ResultCache] = None, blocker: Optional[ResourceBlocker] = None,
+                            on_result: Optional[Callable[[str, str], None]] = None) -> Dict[str, str]:
+    emails = {}
+    pending = []
+    for link in dict.fromkeys(links):
+        cached = cache.get(link) if cache else None
+        if cached is not None:
+            emails[link] = cached
+            metrics.increment('facebook_cache_hits')
+        else:
+            pending.append(link)
+    if emails:
+        print(f"Facebook cache: {len(emails)} pages known, {len(pending)} to visit")
+
+    def store(index, link, email):
+        if email is None:
+            return
+        emails[link] = email
+        if cache:
+            cache.set(link, email)
+        if on_result:
+            on_result(link, email)
+
+    if pending:
+        run_async(_extract_async(pending, workers, timeout, fast, blocker, store))
+    return emails
@@ -0,0 +1,184 @@
+import argparse
+import math
+import re
+from collections import namedtuple
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote_plus
+
+import requests
+from playwright.async_api import async_playwright
+
+from async_browser import map_pages, run_async
+from browser_profile import ResourceBlocker, launch_browser
+from place_store import place_key
+from rate_limiter import limiter
+from results_feed import scroll_feed_async
+from run_metrics import metrics
+
+NOMINATIM_URL = 'https://nominatim.openstreetmap.org/search'
+VIEWPORT = {"width": 1920, "height": 1080}
+# Part of the viewport left of the map is covered by the results panel
+MAP_WIDTH_PX = 1500
+# A feed is scrolled past the size of a single Maps result list, so a capped cell is recognisable
+CELL_LIMIT = 500
+
+BoundingBox = namedtuple('BoundingBox', ['south', 'west', 'north', 'east'])
+
+def parse_bbox(text: str) -> Optional[BoundingBox]:
+    # "south,west,north,east" in decimal degrees
+    parts = re.split(r'[,\s]+', text.strip())
+    if len(parts) != 4:
+        return None
+    try:
+        south, west, north, east = (float(part) for part in parts)
+    except ValueError:
+        return None
+    if south >= north or west >= east:
+        raise ValueError(f"Bounding box {text!r} must be south,west,north,east")
+    return BoundingBox(south, west, north, east)
+
+def geocode_area(name: str) -> BoundingBox:
+    response = limiter.call(NOMINATIM_URL, lambda: requests.get(
+        NOMINATIM_URL, params={'q': name, 'format': 'json', 'limit': 1},
+        headers={'User-Agent': 'google-maps-scrapper tiling'}, timeout=30
+    ), lambda response: (response.status_code, response.headers))
+    response.raise_for_status()
+    matches = response.json()
+    if not matches:
+        raise ValueError(f"Could not geocode {name!r}")
+    south, north, west, east = (float(value) for value in matches[0]['boundingbox'])
+    return BoundingBox(south, west, north, east)
+
+def resolve_area(area: str) -> BoundingBox:
+    return parse_bbox(area) or geocode_area(area)
+
+def _km_per_degree_lng(lat: float) -> float:
+    return 111.32 * math.cos(math.radians(lat))
+
+def grid_cells(bbox: BoundingBox, cell_km: float) -> List[BoundingBox]:
+    center_lat = (bbox.south + bbox.north) / 2
+    lat_step = cell_km / 110.57
+    lng_step = cell_km / max(_km_per_degree_lng(center_lat), 1e-6)
+    rows = max(1, math.ceil((bbox.north - bbox.south) / lat_step))
+    columns = max(1, math.ceil((bbox.east - bbox.west) / lng_step))
+    lat_step = (bbox.north - bbox.south) / rows
+    lng_step = (bbox.east - bbox.west) / columns
+    return [
+        BoundingBox(bbox.south + row * lat_step, bbox.west + column * lng_step,
+                    bbox.south + (row + 1) * lat_step, bbox.west + (column + 1) * lng_step)
+        for row in range(rows) for column in range(columns)
+    ]
+
+def split_cell(cell: BoundingBox) -> List[BoundingBox]:
+    mid_lat = (cell.south + cell.north) / 2
+    mid_lng = (cell.west + cell.east) / 2
+    return [
+        BoundingBox(cell.south, cell.west, mid_lat, mid_lng),
+        BoundingBox(cell.south, mid_lng, mid_lat, cell.east),
+        BoundingBox(mid_lat, cell.west, cell.north, mid_lng),
+        BoundingBox(mid_lat, mid_lng, cell.north, cell.east),
+    ]
+
+def cell_zoom(cell: BoundingBox) -> int:
+    # Highest Web Mercator zoom at which the whole cell is still inside the visible map
+    lat = (cell.south + cell.north) / 2
+    meters_per_pixel_z0 = 156543.03 * math.cos(math.radians(lat))
+    width_m = max((cell.east - cell.west) * _km_per_degree_lng(lat) * 1000, 1)
+    height_m = max((cell.north - cell.south) * 110570, 1)
+    zoom = math.log2(min(meters_per_pixel_z0 * MAP_WIDTH_PX / width_m,
+                         meters_per_pixel_z0 * VIEWPORT['height'] / height_m))
+    return max(3, min(21, math.floor(zoom)))
+
+def cell_search_url(query: str, cell: BoundingBox) -> str:
+    lat = (cell.south + cell.north) / 2
+    lng = (cell.west + cell.east) / 2
+    return f"https://www.google.com/maps/search/{quote_plus(query)}/@{lat:.6f},{lng:.6f},{cell_zoom(cell)}z"
+
+async def _search_cell(page, task: Tuple[str, BoundingBox]) -> Tuple[List[str], bool]:
+    query, cell = task
+    with metrics.timer('tile_cell_seconds'):
+        await limiter.goto_async(page, cell_search_url(query, cell), timeout=60000)
+        try:
+            return await scroll_feed_async(page, CELL_LIMIT)
+        except Exception:
+            # A search with a single hit opens that place instead of a result list
+            if '/maps/place/' in page.url:
+                return [page.url], True
+            raise
+
+def _failed_cell(task: Tuple[str, BoundingBox], error: Exception) -> Optional[Tuple[List[str], bool]]:
+    print(f"Error searching cell {tuple(round(value, 5) for value in task[1])}: {str(error) or type(error).__name__}")
+    metrics.count_error('tiling', error)
+    return None
+
+async def _tile_async(query: str, cells: List[BoundingBox], total: int, workers: int, timeout: float, fast: bool,
+                      max_depth: int, saturation: int, blocker: Optional[ResourceBlocker]) -> List[str]:
+    links: Dict[str, str] = {}
+    async with async_playwright() as p:
+        browser = await launch_browser(p, fast)
+        try:
+            depth = 0
+            while cells and len(links) < total:
+                saturated = []
+                searched = []
+
+                async def search(page, task):
+                    # Once `total` places are in, the cells still queued are skipped instead of searched
+                    if len(links) >= total:
+                        return None
+                    searched.append(task)
+                    return await _search_cell(page, task)
+
+                def collect(index, task, result):
+                    if result is None:
+                        return
+                    hrefs, end = result
+                    for href in hrefs:
+                        links.setdefault(place_key(href), href)
+                    # A list that stops without Maps' end marker after a full page of results is the
+                    # result cap, not the real number of places in the cell
+                    if not end and len(hrefs) >= saturation:
+                        saturated.append(task[1])
+
+                await map_pages(
+                    browser, [(query, cell) for cell in cells], search, workers, timeout, _failed_cell,
+                    context_options={'viewport': VIEWPORT},
+                    setup_page=blocker.install_async if blocker else None,
+                    desc=f"Searching {len(cells)} cells (depth {depth})", on_result=collect
+                )
+                if len(searched) < len(cells):
+                    print(f"Depth {depth}: {len(cells) - len(searched)} cells skipped after reaching {total} places")
+                metrics.increment('tile_cells', len(searched))
+                metrics.increment('tile_cells_saturated', len(saturated))
+                print(f"Depth {depth}: {len(links)} unique places, {len(saturated)} saturated cells")
+                if depth >= max_depth:
+                    if saturated:
+                        print(f"{len(saturated)} cells are still saturated at the maximum depth; use a smaller --tile-km")
+                    break
+                cells = [child for cell in saturated for child in split_cell(cell)]
+                depth += 1
+        finally:
+            await browser.close()
+    return list(links.values())[:total]
+
+# Covers `area` (a "south,west,north,east" box or a place name for Nominatim) with cells of about
+# `cell_km` and runs the search in every cell over a pool of pages. Cells whose result list hits
+# the Maps cap are split into quarters and searched again, up to `max_depth` times. Links are
+# deduplicated by place id across cells.
+def tile_place_links(query: str, area: str, total: int, cell_km: float = 2.0, workers: int = 4, timeout: float = 180,
+                     fast: bool = False, max_depth: int = 3, saturation: int = 100,
+                     blocker: Optional[ResourceBlocker] = None) -> List[str]:
+    bbox = resolve_area(area)
+    cells = grid_cells(bbox, cell_km)
+    print(f"Tiling {tuple(round(value, 5) for value in bbox)} into {len(cells)} cells of ~{cell_km} km")
+    return run_async(_tile_async(query, cells, total, workers, timeout, fast, max_depth, saturation, blocker))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print the cell search URLs a tiled search would start with")
+    parser.add_argument("-s", "--search", type=str, required=True)
+    parser.add_argument("--area", type=str, required=True, help="south,west,north,east or a place name")
+    parser.add_argument("--cell-km", type=float, default=2.0)
+    args = parser.parse_args()
+
+    for cell in grid_cells(resolve_area(args.area), args.cell_km):
+        print(cell_search_url(args.search, cell))
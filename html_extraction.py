@@ -0,0 +1,136 @@
+import json
+import re
+from typing import Dict, Optional
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:
+    lxml = None
+
+WALK_EVENTS = ('start', 'end', 'comment', 'pi')
+SKIPPED_TEXT_TAGS = {'script', 'style', 'template'}
+HOURS_CLASS_PATTERN = re.compile(r'hours|schedule|timing', re.I)
+PRICE_CLASS_PATTERN = re.compile(r'price-range|pricing', re.I)
+CUISINE_CLASS_PATTERN = re.compile(r'cuisine|food-type', re.I)
+# An empty mount point of a client-side app, or the notice such apps put in <noscript>
+APP_SHELL_PATTERN = re.compile(
+    r'<div[^>]+id=["\'](?:root|app|__next|__nuxt|___gatsby)["\'][^>]*>\s*</div>|enable JavaScript to run this app', re.I
+)
+NON_TEXT_BLOCK_PATTERN = re.compile(r'<(script|style|template|noscript)\b.*?</\1\s*>', re.I | re.S)
+TAG_PATTERN = re.compile(r'<[^>]+>')
+
+def is_available() -> bool:
+    return lxml is not None
+
+# Everything WebsiteDataExtractor reads from a page, collected in one walk over one lxml tree
+class ParsedPage:
+    def __init__(self):
+        self.schema_data = {}
+        self.meta_data = {}
+        self.anchors = []
+        self.text = ''
+        self.hours_text = None
+        self.price_range = None
+        self.cuisine = None
+
+def _parse_tree(html: str):
+    if not html or not html.strip():
+        return None
+    for source in (html, html.encode('utf-8')):
+        try:
+            return lxml.html.document_fromstring(source)
+        except (etree.ParserError, ValueError):
+            # lxml rejects str input carrying an XML encoding declaration, so that is retried as bytes.
+            # A page of only comments or whitespace has no document at all and parses to nothing.
+            continue
+    return None
+
+def _merge_schema(schema_data: Dict, raw: Optional[str]):
+    try:
+        data = json.loads(raw)
+    except (TypeError, ValueError):
+        return
+    if isinstance(data, dict):
+        schema_data.update(data)
+    elif isinstance(data, list):
+        for item in data:
+            if isinstance(item, dict):
+                schema_data.update(item)
+
+def _collect_text(element, strip: bool = False) -> str:
+    # Mirrors BeautifulSoup's get_text(): strings in document order, script/style/template skipped
+    parts = []
+    skip_depth = 0
+    for event, node in etree.iterwalk(element, events=WALK_EVENTS):
+        tag = node.tag if isinstance(node.tag, str) else None
+        if event in ('comment', 'pi'):
+            if not skip_depth and node.tail:
+                parts.append(node.tail.strip() if strip else node.tail)
+        elif event == 'start':
+            if tag in SKIPPED_TEXT_TAGS:
+                skip_depth += 1
+            elif tag and not skip_depth and node.text:
+                parts.append(node.text.strip() if strip else node.text)
+        else:
+            if tag in SKIPPED_TEXT_TAGS:
+                skip_depth -= 1
+            if node is not element and not skip_depth and node.tail:
+                parts.append(node.tail.strip() if strip else node.tail)
+    return ''.join(parts)
+
+def parse_page(html: str) -> ParsedPage:
+    page = ParsedPage()
+    root = _parse_tree(html)
+    if root is None:
+        return page
+    text_parts = []
+    skip_depth = 0
+    for event, node in etree.iterwalk(root, events=WALK_EVENTS):
+        tag = node.tag if isinstance(node.tag, str) else None
+        if event != 'start':
+            if tag in SKIPPED_TEXT_TAGS:
+                skip_depth -= 1
+            if not skip_depth and node.tail:
+                text_parts.append(node.tail)
+            continue
+        if tag in SKIPPED_TEXT_TAGS:
+            skip_depth += 1
+            if tag == 'script' and node.get('type') == 'application/ld+json':
+                _merge_schema(page.schema_data, node.text)
+            continue
+        if not skip_depth and node.text:
+            text_parts.append(node.text)
+        if tag == 'meta':
+            name = node.get('name', node.get('property', ''))
+            content = node.get('content', '')
+            if name and content:
+                page.meta_data[name] = content
+        elif tag == 'a':
+            href = node.get('href')
+            if href is not None:
+                page.anchors.append(href)
+        classes = node.get('class')
+        if classes:
+            if page.hours_text is None and tag == 'div' and HOURS_CLASS_PATTERN.search(classes):
+                page.hours_text = _collect_text(node, strip=True)
+            if page.price_range is None and PRICE_CLASS_PATTERN.search(classes):
+                page.price_range = _collect_text(node, strip=True)
+            if page.cuisine is None and CUISINE_CLASS_PATTERN.search(classes):
+                page.cuisine = _collect_text(node, strip=True)
+    page.text = ''.join(text_parts)
+    return page
+
+# Whether the static HTML is a shell that scripts fill in: an empty app mount point, or hardly
+# any text outside scripts. Regex-only, so it works without lxml and costs no extra parse.
+def looks_js_rendered(html: str, min_text: int = 300) -> bool:
+    if not html:
+        return False
+    if APP_SHELL_PATTERN.search(html):
+        return True
+    text = TAG_PATTERN.sub(' ', NON_TEXT_BLOCK_PATTERN.sub(' ', html))
+    return len(' '.join(text.split())) < min_text
+
+def visible_text(html: str) -> str:
+    root = _parse_tree(html)
+    return _collect_text(root) if root is not None else ''
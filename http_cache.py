@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+DEFAULT_CACHE_DIR = '.http_cache'
+
+def normalize_url(url: str) -> str:
+    url = url.strip()
+    if not url.lower().startswith(('http://', 'https://')):
+        url = 'https://' + url
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    port = parts.port
+    if port and not ((scheme == 'http' and port == 80) or (scheme == 'https' and port == 443)):
+        host = f"{host}:{port}"
+    path = parts.path or '/'
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, path, query, ''))
+
+# On-disk response cache keyed by the SHA-256 of the normalized URL. Each entry is a body
+# file plus a small JSON metadata file; the body's mtime doubles as the LRU access time.
+class HttpCache:
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, ttl: float = 7 * 24 * 3600, max_bytes: int = 512 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        self._total_bytes = sum(size for _, _, size in self._scan())
+
+    def key(self, url: str) -> str:
+        return hashlib.sha256(normalize_url(url).encode('utf-8')).hexdigest()
+
+    def _paths(self, key: str):
+        directory = os.path.join(self.cache_dir, key[:2])
+        return os.path.join(directory, key + '.body'), os.path.join(directory, key + '.json')
+
+    def get(self, url: str) -> Optional[Dict]:
+        body_path, meta_path = self._paths(self.key(url))
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            with open(body_path, 'r', encoding='utf-8') as f:
+                entry['body'] = f.read()
+            os.utime(body_path)
+            return entry
+        except (OSError, ValueError):
+            return None
+
+    def is_fresh(self, entry: Dict) -> bool:
+        return time.time() - entry.get('fetched_at', 0) < self.ttl
+
+    def conditional_headers(self, entry: Optional[Dict]) -> Dict:
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    # Returns (fresh_body, stale_entry, conditional_headers) for a URL about to be fetched
+    def lookup(self, url: str):
+        entry = self.get(url)
+        if entry and self.is_fresh(entry):
+            return entry['body'], entry, {}
+        return None, entry, self.conditional_headers(entry)
+
+    def store(self, url: str, status: int, headers, body: str):
+        if not 200 <= status < 300:
+            return
+        key = self.key(url)
+        body_path, meta_path = self._paths(key)
+        os.makedirs(os.path.dirname(body_path), exist_ok=True)
+        old_size = os.path.getsize(body_path) if os.path.exists(body_path) else 0
+        data = body.encode('utf-8')
+        tmp_path = body_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, body_path)
+        self._write_meta(meta_path, {
+            'url': normalize_url(url),
+            'status': status,
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+            'fetched_at': time.time(),
+            'size': len(data),
+        })
+        self._total_bytes += len(data) - old_size
+        if self._total_bytes > self.max_bytes:
+            self._evict()
+
+    def revalidated(self, url: str, entry: Dict, headers):
+        # A 304 only refreshes the timestamp and validators; the stored body stays as is
+        _, meta_path = self._paths(self.key(url))
+        meta = {k: v for k, v in entry.items() if k != 'body'}
+        meta['fetched_at'] = time.time()
+        meta['etag'] = headers.get('ETag') or meta.get('etag')
+        meta['last_modified'] = headers.get('Last-Modified') or meta.get('last_modified')
+        self._write_meta(meta_path, meta)
+
+    def _write_meta(self, meta_path: str, meta: Dict):
+        tmp_path = meta_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+
+    def _scan(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith('.body'):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    yield path, stat.st_mtime, stat.st_size
+
+    def _evict(self):
+        target = self.max_bytes * 0.9
+        for body_path, _, size in sorted(self._scan(), key=lambda item: item[1]):
+            if self._total_bytes <= target:
+                break
+            for path in (body_path, body_path[:-len('.body')] + '.json'):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._total_bytes -= size
@@ -1,423 +1,307 @@
 from playwright.sync_api import sync_playwright
 import pandas as pd
 import argparse
-import re
-import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin
 import json
-from typing import Dict, List, Optional
+import os
+from typing import Callable, Dict, Iterator, List
 import time
 from tqdm import tqdm
-
-class WebsiteDataExtractor:
-    def __init__(self):
-        self.patterns = {
-            'email': r'[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}',
-            'phone': r'(\+\d{1,3}[-.]?)?\s*\(?\d{3}\)?[-.]?\s*\d{3}[-.]?\s*\d{4}',
-            'social_media': {
-                'facebook': r'facebook\.com/[A-Za-z0-9.]+',
-                'instagram': r'instagram\.com/[A-Za-z0-9_]+',
-                'twitter': r'twitter\.com/[A-Za-z0-9_]+',
-                'linkedin': r'linkedin\.com/[A-Za-z0-9_]+',
-                'youtube': r'youtube\.com/[A-Za-z0-9_]+',
-            }
-        }
-
-    def extract_structured_data(self, url: str) -> Dict:
-        if not url or url == "N/A":
-            return self._get_empty_result()
+from http_cache import HttpCache, DEFAULT_CACHE_DIR
+from website_extractor import WebsiteDataExtractor, AsyncWebsiteDataExtractor
+from place_details import PLACE_XPATHS, extract_place_details, null_record, scrape_place_details
+from maps_payload import ResponseCapture
+from results_feed import MAPS_URL, discover_place_links, listing_locators, open_maps, search_maps
+from run_state import RunCheckpoint
+from browser_profile import ResourceBlocker, launch_browser, load_block_config
+from facebook_emails import DEFAULT_CACHE_PATH as FACEBOOK_CACHE_PATH, extract_facebook_emails
+from result_cache import ResultCache
+from place_store import DEFAULT_STORE_PATH, PlaceStore, place_key
+from geo_tiling import tile_place_links
+from run_metrics import metrics
+from columnar_output import (StreamingTableWriter, output_path, parse_formats, website_row, website_schema,
+                             write_business_rows)
+from rendered_fetch import render_emails
+from pipeline import ScrapePipeline
+from rate_limiter import limiter
+from post_processing import (ADDRESS_COLUMNS, clean_emails, drop_constant_columns, facebook_email_column,
+                             search_queries, split_addresses, website_columns)
+
+def enrich_websites(extractor: WebsiteDataExtractor, websites: List[str], on_result: Callable[[str, Dict], None]):
+    if isinstance(extractor, AsyncWebsiteDataExtractor):
+        extractor.extract_all(websites, on_result=on_result)
+        return
+    for website in tqdm(websites, desc="Processing websites"):
+        # Pacing is left to the per-host rate limiter instead of a fixed pause after every site
+        on_result(website, extractor.extract_structured_data(website))
+
+def slim_website_data(data: Dict) -> Dict:
+    # Only what the output columns need stays in memory; full details live in the run's websites.jsonl
+    return {
+        'contact_info': {'emails': data['contact_info']['emails'], 'phones': data['contact_info']['phones']},
+        'social_media': data['social_media'],
+        'business_hours': data['business_hours'],
+        'js_rendered': data.get('js_rendered', False),
+    }
+
+def write_json_array(records: Iterator[Dict], path: str):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write('[')
+        for count, record in enumerate(records):
+            f.write(',\n' if count else '\n')
+            f.write(json.dumps(record, indent=2))
+        f.write('\n]')
+    os.replace(tmp_path, path)
+
+# Fills scraped_data[index] for every pending index. Without a results feed to click (tiled and
+# pipelined runs) or with several workers, places are opened by URL in a page pool; otherwise the
+# listings of the single search are clicked one by one.
+def scrape_pending_places(page, listings, place_links: List[str], pending: List[int], scraped_data: List,
+                          detail_workers: int, checkpoint: RunCheckpoint, fast: bool, blocker):
+    if listings is None or detail_workers > 1:
+        def store_place(position, place_link, record):
+            scraped_data[pending[position]] = record
+            if record != null_record():
+                checkpoint.record_place(place_link, record)
+
+        scrape_place_details([place_links[index] for index in pending], workers=detail_workers, fast=fast,
+                             on_result=store_place, blocker=blocker)
+        return
+    for index in pending:
         try:
-            session = self._create_session()
-            soup = self._get_page_content(url, session)
-            data = {
-                'url': url,
-                'structured_data': self._extract_schema_data(soup),
-                'meta_data': self._extract_meta_data(soup),
-                'contact_info': self._extract_contact_info(soup, url, session),
-                'social_media': self._extract_social_media(soup),
-                'business_hours': self._extract_business_hours(soup),
-                'additional_info': self._extract_additional_info(soup)
-            }
-            return data
+            started = time.perf_counter()
+            limiter.call(MAPS_URL, listings[index].click, retries=0)
+            page.wait_for_selector(PLACE_XPATHS['name'])
+            page.wait_for_timeout(4000)
+
+            scraped_data[index] = extract_place_details(page)
+            checkpoint.record_place(place_links[index], scraped_data[index])
+            metrics.observe('place_detail_seconds', time.perf_counter() - started)
+
+            page.wait_for_timeout(1000)
+
         except Exception as e:
-            print(f"Error extracting data from {url}: {str(e)}")
-            return self._get_empty_result()
-
-    def _create_session(self):
-        session = requests.Session()
-        session.verify = False
-        session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-        })
-        return session
-
-    def _get_page_content(self, url: str, session) -> BeautifulSoup:
-        if not url.startswith(('http://', 'https://')):
-            url = 'https://' + url
-        for attempt in range(3):
-            try:
-                response = session.get(url, timeout=20)
-                return BeautifulSoup(response.text, 'html.parser')
-            except:
-                if attempt == 2:
-                    raise
-                time.sleep(1)
-
-    def _extract_schema_data(self, soup: BeautifulSoup) -> Dict:
-        schema_data = {}
-        scripts = soup.find_all('script', type='application/ld+json')
-        for script in scripts:
-            try:
-                data = json.loads(script.string)
-                if isinstance(data, dict):
-                    schema_data.update(data)
-                elif isinstance(data, list):
-                    for item in data:
-                        if isinstance(item, dict):
-                            schema_data.update(item)
-            except:
-                continue
-        return schema_data
-
-    def _extract_meta_data(self, soup: BeautifulSoup) -> Dict:
-        meta_data = {}
-        for meta in soup.find_all('meta'):
-            name = meta.get('name', meta.get('property', ''))
-            content = meta.get('content', '')
-            if name and content:
-                meta_data[name] = content
-        return meta_data
-
-    def _extract_contact_info(self, soup: BeautifulSoup, url: str, session) -> Dict:
-        contact_info = {'emails': [], 'phones': [], 'address': None}
-        text = soup.get_text()
-        contact_info['emails'] = self._extract_emails(text)
-        contact_info['phones'] = self._extract_phones(text)
-        contact_links = soup.find_all('a', href=re.compile(r'contact|about|get-in-touch|reach-us', re.I))
-        for link in contact_links[:2]:
-            try:
-                contact_url = urljoin(url, link['href'])
-                response = session.get(contact_url, timeout=10)
-                contact_soup = BeautifulSoup(response.text, 'html.parser')
-                contact_text = contact_soup.get_text()
-                contact_info['emails'].extend(self._extract_emails(contact_text))
-                contact_info['phones'].extend(self._extract_phones(contact_text))
-            except:
-                continue
-        contact_info['emails'] = list(set(contact_info['emails']))
-        contact_info['phones'] = list(set(contact_info['phones']))
-        return contact_info
-
-    def _extract_social_media(self, soup: BeautifulSoup) -> Dict:
-        social_media = {}
-        for platform, pattern in self.patterns['social_media'].items():
-            links = soup.find_all('a', href=re.compile(pattern, re.I))
-            if links:
-                social_media[platform] = list(set([link['href'] for link in links]))
-        return social_media
-
-    def _extract_business_hours(self, soup: BeautifulSoup) -> Optional[Dict]:
-        schema_data = self._extract_schema_data(soup)
-        if 'openingHours' in schema_data:
-            return schema_data['openingHours']
-        hours_div = soup.find('div', class_=re.compile(r'hours|schedule|timing', re.I))
-        if hours_div:
-            return {'raw': hours_div.get_text(strip=True)}
-        return {}
-
-    def _extract_additional_info(self, soup: BeautifulSoup) -> Dict:
-        info = {}
-        price_range = soup.find(class_=re.compile(r'price-range|pricing', re.I))
-        if price_range:
-            info['price_range'] = price_range.get_text(strip=True)
-        cuisine = soup.find(class_=re.compile(r'cuisine|food-type', re.I))
-        if cuisine:
-            info['cuisine'] = cuisine.get_text(strip=True)
-        return info
-
-    def _extract_emails(self, text: str) -> List[str]:
-        emails = re.findall(self.patterns['email'], text)
-        return [email for email in emails if not email.endswith(('.png', '.jpg', '.gif', '.jpeg')) and len(email) < 100]
-
-    def _extract_phones(self, text: str) -> List[str]:
-        return re.findall(self.patterns['phone'], text)
-
-    def _get_empty_result(self) -> Dict:
-        return {'url': None, 'structured_data': {}, 'meta_data': {}, 'contact_info': {'emails': [], 'phones': [], 'address': None}, 'social_media': {}, 'business_hours': {}, 'additional_info': {}}
-
-def main(search_for, total):
+            print(f"Null scraping listing: {str(e)}")
+            metrics.count_error('place_details', e)
+            scraped_data[index] = null_record()
+
+def main(search_for, total, async_websites=False, concurrency=20, per_host=2, cache_dir=DEFAULT_CACHE_DIR, cache_ttl_hours=168, cache_max_mb=512, capture_network=False, detail_workers=1,
+         output_csv='business_data.csv', output_json='detailed_business_data.json', run_dir=None, resume=False,
+         fast=False, block_config=None, facebook_workers=4, facebook_cache_path=FACEBOOK_CACHE_PATH, facebook_cache_ttl_hours=168,
+         store_path=DEFAULT_STORE_PATH, refresh_older_than=None,
+         tile_area=None, tile_km=2.0, tile_workers=4, tile_max_depth=3, tile_saturation=100,
+         report_path=None, metrics_port=None, output_formats='csv', render_fallback=False, render_workers=4,
+         pipeline=False, pipeline_queue=50, max_rate=10.0, breaker_failures=5, breaker_seconds=300, keep_place_key=False):
+    formats = parse_formats(output_formats)
+    metrics.reset()
+    limiter.configure(max_rate=max_rate, failure_threshold=breaker_failures, open_seconds=breaker_seconds)
+    if metrics_port:
+        metrics.serve(metrics_port)
+    # Every record is flushed to the run's sinks as it completes, so a crash keeps all finished work
+    checkpoint = RunCheckpoint(run_dir or os.path.splitext(output_csv)[0] + '_run', resume=resume)
+    cache = HttpCache(cache_dir, ttl=cache_ttl_hours * 3600, max_bytes=cache_max_mb * 1024 * 1024) if cache_dir else None
+    if async_websites or pipeline:
+        extractor = AsyncWebsiteDataExtractor(concurrency=concurrency, per_host=per_host, cache=cache)
+    else:
+        extractor = WebsiteDataExtractor(cache=cache)
+    facebook_cache = ResultCache(facebook_cache_path, ttl=facebook_cache_ttl_hours * 3600) if facebook_cache_path else None
     with sync_playwright() as p:
-        browser = p.chromium.launch(headless=False)
+        browser = launch_browser(p, fast)
         page = browser.new_page()
         page.set_viewport_size({"width": 1920, "height": 1080})
-
-        name_xpath = '//div[@class="TIHn2 "]//h1[@class="DUwDvf lfPIob"]'
-        address_xpath = '//button[@data-item-id="address"]//div[contains(@class, "fontBodyMedium")]'
-        website_xpath = '//a[@data-item-id="authority"]//div[contains(@class, "fontBodyMedium")]'
-        phone_number_xpath = '//button[contains(@data-item-id, "phone:tel:")]//div[contains(@class, "fontBodyMedium")]'
-        reviews_count_xpath = '//div[@class="TIHn2 "]//div[@class="fontBodyMedium dmRWX"]//div//span//span//span[@aria-label]'
-        reviews_average_xpath = '//div[@class="TIHn2 "]//div[@class="fontBodyMedium dmRWX"]//div//span[@aria-hidden]'
-        intro_xpath = '//div[@class="WeS02d fontBodyMedium"]//div[@class="PYvSYb "]'
-        info1 = '//div[@class="LTs0Rc"][1]'
-        info2 = '//div[@class="LTs0Rc"][2]'
-        info3 = '//div[@class="LTs0Rc"][3]'
-        opens_at_xpath = '//button[contains(@data-item-id, "oh")]//div[contains(@class, "fontBodyMedium")]'
-        opens_at_xpath2 = '//div[@class="MkV9"]//span[@class="ZDu9vd"]//span[2]'
-        place_type_xpath = '//div[@class="LBgpqf"]//button[@class="DkEaL "]'
-
-        page.goto("https://www.google.com/maps", timeout=60000)
-        page.wait_for_timeout(3000)
-
-        search_box = page.locator('//input[@id="searchboxinput"]')
-        search_box.click()
-        search_box.fill(search_for)
-        page.keyboard.press("Enter")
-
-        page.wait_for_selector('//a[contains(@href, "https://www.google.com/maps/place")]')
-        page.hover('//a[contains(@href, "https://www.google.com/maps/place")]')
-
-        listings = []
-        last_height = 0
-
-        while len(listings) < total:
-            page.mouse.wheel(0, 10000)
-            page.wait_for_selector('//a[contains(@href, "https://www.google.com/maps/place")]')
-            time.sleep(14)  # Wait for content to load
-
-            new_listings = page.locator('//a[contains(@href, "https://www.google.com/maps/place")]').all()
-            new_listings = [listing.locator("xpath=..") for listing in new_listings]
-            if len(new_listings) > len(listings):
-                listings = new_listings
-                print(f"Currently Found: {len(listings)}")
+        blocker = ResourceBlocker(load_block_config(block_config)) if fast else None
+        if blocker:
+            blocker.install(page)
+
+        store = PlaceStore(store_path) if store_path else None
+        pipeline_websites = set()
+        # The pipeline times its own stages, which overlap; here it is timed as a whole
+        with metrics.stage('pipeline' if pipeline else 'discovery'):
+            capture = None
+            if pipeline:
+                # All four stages run at once; the phases below only retry what the pipeline could not finish
+                place_links, pipeline_websites = ScrapePipeline(
+                    search_for, total, checkpoint, extractor, detail_workers=detail_workers, facebook_workers=facebook_workers,
+                    queue_size=pipeline_queue, facebook_cache=facebook_cache, render_fallback=render_fallback, fast=fast, blocker=blocker,
+                    store=store, refresh_older_than=refresh_older_than
+                ).run()
+                listings = None
+                if capture_network or tile_area:
+                    print("--capture-network and --tile-area only apply to the phased run; they are ignored with --pipeline")
+            elif tile_area:
+                # Cells are searched in their own pages, so there is no feed to click listings in
+                place_links = tile_place_links(search_for, tile_area, total, cell_km=tile_km, workers=tile_workers, fast=fast,
+                                               max_depth=tile_max_depth, saturation=tile_saturation, blocker=blocker)
+                listings = None
+                detail_workers = max(detail_workers, tile_workers)
+                if capture_network:
+                    print("--capture-network only applies to a single search; it is ignored with --tile-area")
             else:
-                current_height = page.evaluate("window.scrollY")
-                if current_height == last_height:
-                    print(f"No new results found, stopping scroll. Found {len(listings)} results.")
-                    break
-                last_height = current_height
+                open_maps(page)
+
+                if capture_network:
+                    capture = ResponseCapture()
+                    capture.attach(page)
+
+                search_maps(page, search_for)
 
-        listings = listings[:total]
+                place_links = discover_place_links(page, total)
+                listings = listing_locators(page, len(place_links))
+        if not pipeline:
+            metrics.add_items('discovery', len(place_links))
+        if capture:
+            capture.detach(page)
+            print(f"Captured {len(capture.records)} places from {capture.responses} Maps responses")
 
+        completed_places = checkpoint.completed_places()
+        if completed_places:
+            print(f"Resuming: {len(completed_places)} places already scraped")
         scraped_data = []
-        for listing in listings:
-            try:
-                listing.click()
-                page.wait_for_selector(name_xpath)
-                page.wait_for_timeout(4000)
-
-                name = page.locator(name_xpath).inner_text() if page.locator(name_xpath).count() > 0 else ""
-                address = page.locator(address_xpath).inner_text() if page.locator(address_xpath).count() > 0 else ""
-                website = page.locator(website_xpath).inner_text() if page.locator(website_xpath).count() > 0 else ""
-                phone = page.locator(phone_number_xpath).inner_text() if page.locator(phone_number_xpath).count() > 0 else ""
-                place_type = page.locator(place_type_xpath).inner_text() if page.locator(place_type_xpath).count() > 0 else ""
-                introduction = page.locator(intro_xpath).inner_text() if page.locator(intro_xpath).count() > 0 else "None Found"
-
-                reviews_count = 0
-                if page.locator(reviews_count_xpath).count() > 0:
-                    temp = page.locator(reviews_count_xpath).inner_text()
-                    temp = temp.replace('(', '').replace(')', '').replace(',', '')
-                    reviews_count = int(temp)
-
-                reviews_average = 0.0
-                if page.locator(reviews_average_xpath).count() > 0:
-                    temp = page.locator(reviews_average_xpath).inner_text()
-                    temp = temp.replace(' ', '').replace(',', '.')
-                    reviews_average = float(temp)
-
-                store_shopping = "No"
-                in_store_pickup = "No"
-                store_delivery = "No"
-
-                if page.locator(info1).count() > 0:
-                    temp = page.locator(info1).inner_text()
-                    temp = temp.split('·')
-                    if len(temp) > 1:
-                        check = temp[1].replace("\n", "")
-                        if 'shop' in check.lower():
-                            store_shopping = "Yes"
-                        elif 'pickup' in check.lower():
-                            in_store_pickup = "Yes"
-                        elif 'delivery' in check.lower():
-                            store_delivery = "Yes"
-
-                if page.locator(info2).count() > 0:
-                    temp = page.locator(info2).inner_text()
-                    temp = temp.split('·')
-                    if len(temp) > 1:
-                        check = temp[1].replace("\n", "")
-                        if 'pickup' in check.lower():
-                            in_store_pickup = "Yes"
-                        elif 'shop' in check.lower():
-                            store_shopping = "Yes"
-                        elif 'delivery' in check.lower():
-                            store_delivery = "Yes"
-
-                if page.locator(info3).count() > 0:
-                    temp = page.locator(info3).inner_text()
-                    temp = temp.split('·')
-                    if len(temp) > 1:
-                        check = temp[1].replace("\n", "")
-                        if 'delivery' in check.lower():
-                            store_delivery = "Yes"
-                        elif 'pickup' in check.lower():
-                            in_store_pickup = "Yes"
-                        elif 'shop' in check.lower():
-                            store_shopping = "Yes"
-
-                opens_at = ""
-                if page.locator(opens_at_xpath).count() > 0:
-                    opens = page.locator(opens_at_xpath).inner_text()
-                    opens = opens.split('⋅')
-                    if len(opens) != 1:
-                        opens = opens[1]
-                    opens = opens.replace("\u202f", "")
-                    opens_at = opens
-                elif page.locator(opens_at_xpath2).count() > 0:
-                    opens = page.locator(opens_at_xpath2).inner_text()
-                    opens = opens.split('⋅')
-                    opens = opens[1]
-                    opens = opens.replace("\u202f", "")
-                    opens_at = opens
-
-                scraped_data.append({
-                    'Names': name,
-                    'Website': website,
-                    'Introduction': introduction,
-                    'Phone Number': phone,
-                    'Address': address,
-                    'Review Count': reviews_count,
-                    'Average Review Count': reviews_average,
-                    'Store Shopping': store_shopping,
-                    'In Store Pickup': in_store_pickup,
-                    'Delivery': store_delivery,
-                    'Type': place_type,
-                    'Opens At': opens_at
-                })
-
-                page.wait_for_timeout(1000)
-
-            except Exception as e:
-                print(f"Null scraping listing: {str(e)}")
-                scraped_data.append({
-                    'Names': "Null",
-                    'Website': "Null",
-                    'Introduction': "Null",
-                    'Phone Number': "Null",
-                    'Address': "Null",
-                    'Review Count': 0,
-                    'Average Review Count': 0.0,
-                    'Store Shopping': "No",
-                    'In Store Pickup': "No",
-                    'Delivery': "No",
-                    'Type': "Null",
-                    'Opens At': "Null"
-                })
+        for place_link in place_links:
+            record = completed_places.get(place_link)
+            if record is None and capture:
+                record = capture.record_for(place_link)
+                if record:
+                    checkpoint.record_place(place_link, record)
+            scraped_data.append(record)
+
+        # Places the store saw recently are taken as they are; unchanged_keys later also
+        # collects places whose fresh scrape matches the stored fingerprint
+        keys = [place_key(place_link) for place_link in place_links]
+        unchanged_keys = set()
+        if store and refresh_older_than is not None:
+            for index, record in enumerate(scraped_data):
+                stored = store.recent_record(keys[index], refresh_older_than) if record is None else None
+                if stored:
+                    scraped_data[index] = stored
+                    unchanged_keys.add(keys[index])
+            print(f"Place store: {len(unchanged_keys)} places scraped in the last {refresh_older_than}h are skipped")
+        pending = [index for index, record in enumerate(scraped_data) if record is None]
+        with metrics.stage('place_details', items=len(pending)):
+            scrape_pending_places(page, listings, place_links, pending, scraped_data, detail_workers, checkpoint, fast, blocker)
+
+        if store:
+            for index, record in enumerate(scraped_data):
+                if keys[index] in unchanged_keys or record == null_record():
+                    continue
+                changed = store.save_place(keys[index], place_links[index], record)
+                if not changed and refresh_older_than is not None:
+                    unchanged_keys.add(keys[index])
 
         df = pd.DataFrame(scraped_data)
-        df = df.drop_duplicates(subset=['Names'], keep='first')
-        for column in df.columns:
-            if df[column].nunique() == 1:
-                df.drop(column, axis=1, inplace=True)
+        df['place_key'] = keys
+        df = df.drop_duplicates(subset=['place_key'], keep='first')
+        # Website drives enrichment and the store even when every row shares one (a one-row result, for instance)
+        df = drop_constant_columns(df, keep=['place_key', 'Website'])
 
         print("\nExtracting detailed website data...")
-        extractor = WebsiteDataExtractor()
-        website_data = []
-
-        for website in tqdm(df['Website'].tolist(), desc="Processing websites"):
-            data = extractor.extract_structured_data(website)
-            website_data.append(data)
-            time.sleep(1)
-
-        df['Email'] = [data['contact_info']['emails'][0] if data['contact_info']['emails'] else 'N/A' for data in website_data]
-        df['Additional_Phones'] = [', '.join(data['contact_info']['phones']) if data['contact_info']['phones'] else 'N/A' for data in website_data]
-        df['Facebook'] = [', '.join(data['social_media'].get('facebook', [])) if data['social_media'].get('facebook') else 'N/A' for data in website_data]
-        df['Instagram'] = [', '.join(data['social_media'].get('instagram', [])) if data['social_media'].get('instagram') else 'N/A' for data in website_data]
-        df['Twitter'] = [', '.join(data['social_media'].get('twitter', [])) if data['social_media'].get('twitter') else 'N/A' for data in website_data]
-        df['Linkedin'] = [', '.join(data['social_media'].get('linkedin', [])) if data['social_media'].get('linkedin') else 'N/A' for data in website_data]
-        df['Youtube'] = [', '.join(data['social_media'].get('youtube', [])) if data['social_media'].get('youtube') else 'N/A' for data in website_data]
-        df['Business_Hours'] = [str(data['business_hours']) if data['business_hours'] else 'N/A' for data in website_data]
-
-        def extract_address_components(address):
-            if not address:
-                return None, None, None, None
-            parts = address.split(', ')
-            street = parts[0] if parts else None
-            city = parts[1] if len(parts) > 1 else None
-            state = parts[2].split(' ')[0] if len(parts) > 2 else None
-            postal_code = parts[2].split(' ')[1] if len(parts) > 2 and len(parts[2].split(' ')) > 1 else None
-            return street, city, state, postal_code
-
-        df[['Street', 'City', 'State', 'Postal Code']] = df['Address'].apply(lambda x: pd.Series(extract_address_components(x)))
-
-        for website in tqdm(df['Website'].tolist(), desc="Processing websites"):
-            data = extractor.extract_structured_data(website)
-            website_data.append(data)
-            time.sleep(1)
-
-        df['email_1'] = 'N/A'
-        for index, row in tqdm(df.iterrows(), total=df.shape[0], desc="Extracting Facebook Emails"):
-            facebook_links = row['Facebook'].split(', ')
-            for link in facebook_links:
-                if link != 'N/A':
-                    try:
-                        temp_page = browser.new_page()
-                        temp_page.goto(link, timeout=60000)
-                        temp_page.wait_for_timeout(5000)
-
-                        if temp_page.locator('div[role="dialog"]').count() > 0:
-                            try:
-                                close_button = temp_page.locator('div[role="dialog"] button[aria-label="Close"]')
-                                if close_button.count() > 0:
-                                    close_button.hover()
-                                    close_button.click()
-                                    temp_page.wait_for_timeout(2000)
-                                else:
-                                    print(f"Close button not found on {link}")
-                            except Exception as popup_error:
-                                print(f"Error closing popup on {link}: {popup_error}")
-
-                        content = temp_page.content()
-                        try:
-                            emails = re.findall(r'[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}', content)
-                            if emails:
-                                df.at[index, 'email_1'] = emails[0]
-                            else:
-                                print(f"No email found on {link}")
-                        except Exception as re_error:
-                            print(f"Error finding emails on {link}: {re_error}")
-
-                        temp_page.close()
-
-                    except Exception as e:
-                        print(f"Error navigating to {link}: {e}")
-
-        # Add search query column with dynamic values
-        if not df.empty:  # Check if DataFrame is not empty
-            df['search_query'] = df.apply(
-                lambda row: f"{search_for.split('in')[0].strip()}, {row['Postal Code']}, {row['City']}, {row['State']}, US",
-                axis=1
-            )
-        else:
-            df['search_query'] = "N/A"  # If DataFrame is empty, search_query is "N/A"
-
-        # Email Validation and Cleaning
-        def clean_email(email):
-            if pd.isna(email) or email == 'N/A':
-                return 'N/A'
-            email = email.lower()
-            cleaned_email = re.sub(r'[^a-z@.]', '', email)
-            return cleaned_email
-
-        df['Email'] = df['Email'].apply(clean_email)
-        df['email_1'] = df['email_1'].apply(clean_email)
-
-        with open('detailed_business_data.json', 'w') as f:
-            json.dump(website_data, f, indent=2)
-
-        df.to_csv('business_data.csv', index=False)
+        # Typed detail files are written as website results arrive, starting with those a resumed run already has
+        detail_writers = [StreamingTableWriter(output_path(output_json, fmt), website_schema(), fmt) for fmt in formats if fmt != 'csv']
+        website_summaries = {}
+        for line in checkpoint.website_results():
+            website_summaries[line['website']] = slim_website_data(line['data'])
+            for writer in detail_writers:
+                writer.write(website_row(line['data']))
+
+        keys_by_website = {}
+        for key, website in zip(df['place_key'], df['Website']):
+            keys_by_website.setdefault(website, []).append(key)
+
+        if store and pipeline_websites:
+            for line in checkpoint.website_results():
+                if line['website'] in pipeline_websites:
+                    for key in keys_by_website.get(line['website'], []):
+                        store.save_website(key, line['website'], line['data'])
+
+        def use_website(website, data):
+            checkpoint.record_website(website, data)
+            website_summaries[website] = slim_website_data(data)
+            for writer in detail_writers:
+                writer.write(website_row(data))
+
+        def store_website(website, data):
+            use_website(website, data)
+            if store:
+                for key in keys_by_website.get(website, []):
+                    store.save_website(key, website, data)
+
+        if store and refresh_older_than is not None:
+            for key, website in zip(df['place_key'], df['Website']):
+                stored = store.website_data(key, website) if key in unchanged_keys and website not in website_summaries else None
+                if stored is not None:
+                    use_website(website, stored)
+
+        pending_websites = [website for website in dict.fromkeys(df['Website'].tolist()) if website not in website_summaries]
+        with metrics.stage('website_enrichment', items=len(pending_websites)):
+            enrich_websites(extractor, pending_websites, store_website)
+        website_data = [website_summaries[website] for website in df['Website'].tolist()]
+
+        website_frame = website_columns(website_data, df.index)
+        for column in website_frame.columns:
+            df[column] = website_frame[column]
+
+        if render_fallback:
+            # Browser tier: only sites whose static HTML is a script shell or had no email are rendered
+            escalated = [website for website in dict.fromkeys(df['Website'].tolist())
+                         if website and website not in ('N/A', 'Null')
+                         and (website_summaries[website]['js_rendered'] or not website_summaries[website]['contact_info']['emails'])]
+            rendered_emails = checkpoint.rendered_emails()
+            pending_renders = [website for website in escalated if website not in rendered_emails]
+            print(f"Rendering {len(pending_renders)} of {len(website_summaries)} websites in a browser")
+            with metrics.stage('rendered_websites', items=len(pending_renders)):
+                rendered_emails.update(render_emails(pending_renders, workers=render_workers, fast=fast, blocker=blocker,
+                                                     on_result=checkpoint.record_rendered))
+            static_emails = df['Website'].map(lambda website: (website_summaries[website]['contact_info']['emails'] or ['N/A'])[0])
+            rendered = df['Website'].map(rendered_emails)
+            email_2 = rendered.where(rendered.notna() & (rendered != 'N/A'), static_emails)
+
+        # Post-processing runs in two parts around the Facebook stage; the stage accumulates both
+        with metrics.stage('post_processing'):
+            addresses = df['Address'] if 'Address' in df.columns else pd.Series(None, index=df.index, dtype=object)
+            df[ADDRESS_COLUMNS] = split_addresses(addresses)
+
+        facebook_links = [link for links in df['Facebook'] for link in links.split(', ') if link != 'N/A']
+        facebook_emails = checkpoint.facebook_emails()
+        pending_links = [link for link in facebook_links if link not in facebook_emails]
+        with metrics.stage('facebook', items=len(set(pending_links))):
+            facebook_emails.update(extract_facebook_emails(
+                pending_links, workers=facebook_workers, fast=fast, cache=facebook_cache, blocker=blocker,
+                on_result=checkpoint.record_facebook
+            ))
+        if facebook_cache:
+            facebook_cache.close()
+        df['email_1'] = facebook_email_column(df['Facebook'], facebook_emails)
+        if render_fallback:
+            df['email_2'] = email_2
+
+        with metrics.stage('post_processing'):
+            df['search_query'] = search_queries(search_for, df['Postal Code'], df['City'], df['State'])
+            df['Email'] = clean_emails(df['Email'])
+            df['email_1'] = clean_emails(df['email_1'])
+            if render_fallback:
+                df['email_2'] = clean_emails(df['email_2'])
+        metrics.add_items('post_processing', len(df))
+
+        with metrics.stage('outputs', items=len(df)):
+            if store:
+                store.close()
+            place_keys = df.pop('place_key')
+            if 'csv' in formats:
+                write_json_array((line['data'] for line in checkpoint.website_results()), output_json)
+                # Batch jobs keep the key so their merged output can drop duplicates by place
+                (df.assign(place_key=place_keys) if keep_place_key else df).to_csv(output_csv + '.tmp', index=False)
+                os.replace(output_csv + '.tmp', output_csv)
+            for writer in detail_writers:
+                writer.close()
+            emails = [website_summaries[website]['contact_info']['emails'] for website in df['Website']]
+            for fmt in formats:
+                if fmt != 'csv':
+                    write_business_rows(df, output_path(output_csv, fmt), fmt, emails=emails)
+            checkpoint.close()
+        if blocker:
+            print(blocker.report())
+            metrics.add_bytes('browser', blocker.loaded_bytes)
+        metrics.write_report(report_path or os.path.join(checkpoint.run_dir, 'report.json'))
         print("\nFirst few records:")
         print(df.head())
         browser.close()
@@ -426,6 +310,39 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("-s", "--search", type=str)
     parser.add_argument("-t", "--total", type=int)
+    parser.add_argument("--async-websites", action="store_true", help="Enrich websites concurrently with a pooled asyncio HTTP client")
+    parser.add_argument("--concurrency", type=int, default=20, help="Maximum in-flight website requests in async mode")
+    parser.add_argument("--per-host", type=int, default=2, help="Maximum in-flight requests per host in async mode")
+    parser.add_argument("--cache-dir", type=str, default=DEFAULT_CACHE_DIR, help="Directory of the on-disk website response cache")
+    parser.add_argument("--no-cache", action="store_true", help="Always refetch websites instead of using the response cache")
+    parser.add_argument("--cache-ttl", type=float, default=168, help="Hours before a cached page is revalidated")
+    parser.add_argument("--cache-max-mb", type=int, default=512, help="Size bound of the response cache in megabytes")
+    parser.add_argument("--capture-network", action="store_true", help="Experimental: decode listing details from the Maps search responses and only click listings missing from them or not fully decoded")
+    parser.add_argument("--detail-workers", type=int, default=1, help="Scrape place details in this many concurrent browser pages instead of clicking listings one by one")
+    parser.add_argument("--run-dir", type=str, help="Directory of the per-stage JSONL sinks and checkpoint (default: <output name>_run)")
+    parser.add_argument("--resume", action="store_true", help="Skip places, websites and Facebook pages already completed in the run directory")
+    parser.add_argument("--fast", action="store_true", help="Run headless and block images, media, fonts, map tiles and trackers")
+    parser.add_argument("--block-config", type=str, help="JSON file overriding the resource_types, url_patterns or domains blocked by --fast")
+    parser.add_argument("--facebook-workers", type=int, default=4, help="Concurrent pages used to read Facebook pages")
+    parser.add_argument("--facebook-cache", type=str, default=FACEBOOK_CACHE_PATH, help="SQLite file caching Facebook page -> email results")
+    parser.add_argument("--facebook-cache-ttl", type=float, default=168, help="Hours a cached Facebook result stays valid")
+    parser.add_argument("--store", type=str, default=DEFAULT_STORE_PATH, help="SQLite place store shared across runs (empty string disables it)")
+    parser.add_argument("--refresh-older-than", type=float, help="Hours; places scraped more recently are taken from the store, and unchanged places reuse their stored website data")
+    parser.add_argument("--tile-area", type=str, help="Split the search into map cells covering this area: south,west,north,east or a city name")
+    parser.add_argument("--tile-km", type=float, default=2.0, help="Starting cell size in kilometres for --tile-area")
+    parser.add_argument("--tile-workers", type=int, default=4, help="Cells searched concurrently (also the minimum --detail-workers when tiling)")
+    parser.add_argument("--tile-max-depth", type=int, default=3, help="How many times a saturated cell may be split into quarters")
+    parser.add_argument("--tile-saturation", type=int, default=100, help="Results after which a cell without an end-of-list marker counts as capped")
+    parser.add_argument("--report", type=str, help="Path of the JSON run report with stage timings, latencies and errors (default: <run dir>/report.json)")
+    parser.add_argument("--metrics-port", type=int, help="Serve live metrics in Prometheus text format on this local port")
+    parser.add_argument("--format", type=str, default='csv', help="Comma-separated output formats: csv (CSV plus detailed JSON), parquet, arrow; the last two need pyarrow")
+    parser.add_argument("--render-fallback", action="store_true", help="Render websites with no email in their static HTML (or built by scripts) in a pooled browser and fill email_2")
+    parser.add_argument("--render-workers", type=int, default=4, help="Browser pages used by --render-fallback")
+    parser.add_argument("--pipeline", action="store_true", help="Run discovery, place details, website enrichment and Facebook/rendered emails as overlapping stages joined by bounded queues")
+    parser.add_argument("--pipeline-queue", type=int, default=50, help="Capacity of each queue between pipeline stages")
+    parser.add_argument("--max-rate", type=float, default=10.0, help="Upper bound in requests per second that the adaptive limiter may reach for any one host")
+    parser.add_argument("--breaker-failures", type=int, default=5, help="Failures in a row after which a host is paused")
+    parser.add_argument("--breaker-seconds", type=float, default=300, help="How long a paused host is skipped before a single probe request")
     args = parser.parse_args()
 
     if args.search:
@@ -437,4 +354,15 @@ if __name__ == "__main__":
     else:
         total = 100  # Set the default total to 100
 
-    main(search_for, total)
\ No newline at end of file
+    main(search_for, total, async_websites=args.async_websites, concurrency=args.concurrency, per_host=args.per_host,
+         cache_dir=None if args.no_cache else args.cache_dir, cache_ttl_hours=args.cache_ttl, cache_max_mb=args.cache_max_mb,
+         capture_network=args.capture_network, detail_workers=args.detail_workers,
+         run_dir=args.run_dir, resume=args.resume, fast=args.fast, block_config=args.block_config,
+         facebook_workers=args.facebook_workers, facebook_cache_path=args.facebook_cache, facebook_cache_ttl_hours=args.facebook_cache_ttl,
+         store_path=args.store, refresh_older_than=args.refresh_older_than,
+         tile_area=args.tile_area, tile_km=args.tile_km, tile_workers=args.tile_workers,
+         tile_max_depth=args.tile_max_depth, tile_saturation=args.tile_saturation,
+         report_path=args.report, metrics_port=args.metrics_port, output_formats=args.format,
+         render_fallback=args.render_fallback, render_workers=args.render_workers,
+         pipeline=args.pipeline, pipeline_queue=args.pipeline_queue, max_rate=args.max_rate,
+         breaker_failures=args.breaker_failures, breaker_seconds=args.breaker_seconds)
\ No newline at end of file
@@ -0,0 +1,206 @@
+import argparse
+import json
+import re
+from typing import Any, Dict, Iterator, Optional
+
+XSSI_PREFIX = ")]}'"
+DATA_ID_PATTERN = re.compile(r'0x[0-9a-f]+:0x[0-9a-f]+')
+PLACE_URL_ID_PATTERN = re.compile(r'!1s(0x[0-9a-f]+:0x[0-9a-f]+)')
+CAPTURED_URL_MARKERS = ('/search?', '/maps/preview/place', '/maps/rpc/')
+EMPTY_VALUES = ("", 0, 0.0, "None Found", "No", None)
+# The payload offsets are not yet verified against a recorded Maps response, so a captured place
+# is only used when these fields all decoded into the shape the place panel shows; otherwise the
+# listing is clicked as usual
+REQUIRED_FIELDS = ('Names', 'Address', 'Phone Number', 'Type', 'Opens At')
+PHONE_PATTERN = re.compile(r'\+?[\d\s().-]{7,}')
+WEBSITE_PATTERN = re.compile(r'[\w-]+(\.[\w-]+)+(/\S*)?')
+# Service options whose name contains the keyword set that column, as the panel's info rows do
+SERVICE_COLUMNS = {'shop': 'Store Shopping', 'pickup': 'In Store Pickup', 'delivery': 'Delivery'}
+
+def place_id_from_url(href: str) -> Optional[str]:
+    match = PLACE_URL_ID_PATTERN.search(href or '')
+    return match.group(1) if match else None
+
+def load_payload(body: str) -> Any:
+    body = body.strip()
+    if body.endswith('/*""*/'):
+        body = body[:-len('/*""*/')]
+    if body.startswith(XSSI_PREFIX):
+        body = body[len(XSSI_PREFIX):]
+    data = json.loads(body)
+    # Search responses wrap the real payload as a prefixed string under "d"
+    if isinstance(data, dict) and isinstance(data.get('d'), str):
+        return load_payload(data['d'])
+    return data
+
+def _nth(data, *path):
+    for index in path:
+        if not isinstance(data, list) or index >= len(data):
+            return None
+        data = data[index]
+    return data
+
+def _looks_like_place(node) -> bool:
+    return (
+        isinstance(node, list) and len(node) > 40
+        and isinstance(node[10], str) and DATA_ID_PATTERN.fullmatch(node[10]) is not None
+        and isinstance(node[11], str)
+    )
+
+def find_places(data) -> Iterator[list]:
+    stack = [data]
+    while stack:
+        node = stack.pop()
+        if not isinstance(node, list):
+            continue
+        if _looks_like_place(node):
+            yield node
+            continue
+        stack.extend(reversed(node))
+
+# "Closed ⋅ Opens 9 AM" (the panel's hours row, or a payload's open status) -> " Opens 9AM"
+def parse_opens_at(text: str) -> str:
+    parts = text.split('⋅')
+    opens = parts[1] if len(parts) > 1 else parts[0]
+    return opens.replace("\u202f", "")
+
+def _service_flags(about) -> Dict[str, str]:
+    # About sections are [id, name, options]; an option is [id, name, [_, [[1 if offered]]]]
+    flags = {column: "No" for column in SERVICE_COLUMNS.values()}
+    for section in about if isinstance(about, list) else []:
+        options = _nth(section, 2)
+        for option in options if isinstance(options, list) else []:
+            name = _nth(option, 1)
+            if not isinstance(name, str) or _nth(option, 2, 1, 0, 0) != 1:
+                continue
+            for keyword, column in SERVICE_COLUMNS.items():
+                if keyword in name.lower():
+                    flags[column] = "Yes"
+    return flags
+
+def decode_place(place: list) -> Dict:
+    website = _nth(place, 7, 1) or _nth(place, 7, 0) or ""
+    if isinstance(website, str):
+        website = re.sub(r'^https?://(www\.)?', '', website).rstrip('/')
+    address = _nth(place, 39)
+    if not isinstance(address, str):
+        lines = _nth(place, 2)
+        address = ', '.join(line for line in lines if isinstance(line, str)) if isinstance(lines, list) else ""
+    categories = _nth(place, 13)
+    review_count = _nth(place, 4, 8)
+    rating = _nth(place, 4, 7)
+    introduction = _nth(place, 32, 1, 1)
+    status = _nth(place, 34, 4, 4)
+    services = _service_flags(_nth(place, 100, 1))
+    # Field formats follow place_details.parse_place_record, so captured and clicked places mix in one run
+    return {
+        'Names': place[11],
+        'Website': website,
+        'Introduction': introduction if isinstance(introduction, str) else "None Found",
+        'Phone Number': _nth(place, 178, 0, 0) or "",
+        'Address': address,
+        'Review Count': int(review_count) if isinstance(review_count, (int, float)) else 0,
+        'Average Review Count': float(rating) if isinstance(rating, (int, float)) else 0.0,
+        'Store Shopping': services['Store Shopping'],
+        'In Store Pickup': services['In Store Pickup'],
+        'Delivery': services['Delivery'],
+        'Type': categories[0] if isinstance(categories, list) and categories else "",
+        'Opens At': parse_opens_at(status) if isinstance(status, str) else ""
+    }
+
+def is_complete(record: Dict) -> bool:
+    if any(not isinstance(record.get(field), str) or not record[field].strip() for field in REQUIRED_FIELDS):
+        return False
+    if not PHONE_PATTERN.fullmatch(record['Phone Number']):
+        return False
+    return not record['Website'] or WEBSITE_PATTERN.fullmatch(record['Website']) is not None
+
+def decode_payload(body: str) -> Dict[str, Dict]:
+    records = {}
+    for place in find_places(load_payload(body)):
+        records.setdefault(place[10], decode_place(place))
+    return records
+
+def _merge(existing: Dict, record: Dict) -> Dict:
+    # Later payloads (e.g. place previews) may carry fields the search payload left empty
+    for key, value in record.items():
+        if value not in EMPTY_VALUES and existing.get(key) in EMPTY_VALUES:
+            existing[key] = value
+    return existing
+
+# Collects place records from the search/place XHRs Maps sends while the results feed loads
+class ResponseCapture:
+    def __init__(self):
+        self.records = {}
+        self.responses = 0
+
+    def attach(self, page):
+        page.on("response", self.handle)
+
+    def detach(self, page):
+        page.remove_listener("response", self.handle)
+
+    def handle(self, response):
+        if not any(marker in response.url for marker in CAPTURED_URL_MARKERS):
+            return
+        try:
+            decoded = decode_payload(response.text())
+        except Exception:
+            return
+        self.responses += 1
+        for place_id, record in decoded.items():
+            if place_id in self.records:
+                _merge(self.records[place_id], record)
+            else:
+                self.records[place_id] = record
+
+    def record_for(self, href: str) -> Optional[Dict]:
+        record = self.records.get(place_id_from_url(href))
+        return dict(record) if record and is_complete(record) else None
+
+# Searches Maps in a browser and saves the first search response that holds places, as the
+# ResponseCapture of a real run would see it
+def record_payload(query: str, path: str, timeout_ms: int = 30000):
+    from playwright.sync_api import sync_playwright
+    from browser_profile import launch_browser
+    from results_feed import open_maps, search_maps
+
+    bodies = []
+
+    def keep(response):
+        if bodies or not any(marker in response.url for marker in CAPTURED_URL_MARKERS):
+            return
+        try:
+            body = response.text()
+            if decode_payload(body):
+                bodies.append(body)
+        except Exception:
+            return
+
+    with sync_playwright() as p:
+        browser = launch_browser(p)
+        page = browser.new_page()
+        open_maps(page)
+        page.on("response", keep)
+        search_maps(page, query)
+        for _ in range(timeout_ms // 500):
+            if bodies:
+                break
+            page.wait_for_timeout(500)
+        browser.close()
+    if not bodies:
+        raise RuntimeError(f"No Maps response with places arrived for {query!r}")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(bodies[0])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Decode a recorded Google Maps search or place payload")
+    parser.add_argument("payload_file", type=str)
+    parser.add_argument("--record", type=str, metavar="QUERY", help="First search Maps for QUERY and save its response to payload_file")
+    args = parser.parse_args()
+
+    if args.record:
+        record_payload(args.record, args.payload_file)
+    with open(args.payload_file, encoding='utf-8') as f:
+        decoded = decode_payload(f.read())
+    print(json.dumps(decoded, indent=2, ensure_ascii=False))
@@ -0,0 +1,220 @@
+import asyncio
+from typing import Dict, List, Optional, Set, Tuple
+
+from playwright.async_api import async_playwright
+
+from async_browser import page_worker, run_async
+from browser_profile import ResourceBlocker, launch_browser
+from facebook_emails import facebook_link_failed, fetch_facebook_email
+from place_details import place_failed, scrape_place, null_record
+from place_store import PlaceStore, place_key
+from rendered_fetch import site_render_failed, render_site_email, site_url
+from result_cache import ResultCache
+from results_feed import open_maps_async, scroll_feed_async, search_maps_async
+from run_metrics import metrics
+from run_state import RunCheckpoint
+from website_extractor import AsyncWebsiteDataExtractor
+
+VIEWPORT = {'viewport': {"width": 1920, "height": 1080}}
+SOCIAL_TIMEOUT = 90
+
+def needs_render(website: str, data: Dict) -> bool:
+    # Same escalation rule main() applies with --render-fallback
+    return (bool(website) and website not in ('N/A', 'Null')
+            and (data.get('js_rendered', False) or not data['contact_info']['emails']))
+
+# Runs discovery -> place details -> website enrichment -> Facebook/rendered emails as four
+# concurrent stages joined by bounded queues. Each stage has its own worker count, and a full
+# queue pauses the stage feeding it (discovery stops scrolling while details lag behind), so
+# listing 1 is enriched while listing 50 is still being discovered. Every finished record goes
+# to the checkpoint exactly as the phased run writes it, so main() reads the results back like
+# a resumed run and only retries what failed here.
+class ScrapePipeline:
+    def __init__(self, search_for: str, total: int, checkpoint: RunCheckpoint, extractor: AsyncWebsiteDataExtractor,
+                 detail_workers: int = 4, facebook_workers: int = 4, queue_size: int = 50,
+                 facebook_cache: Optional[ResultCache] = None, render_fallback: bool = False,
+                 fast: bool = False, blocker: Optional[ResourceBlocker] = None, store: Optional[PlaceStore] = None,
+                 refresh_older_than: Optional[float] = None):
+        self.search_for = search_for
+        self.total = total
+        self.checkpoint = checkpoint
+        self.extractor = extractor
+        self.detail_workers = max(1, detail_workers)
+        self.website_workers = max(1, extractor.concurrency)
+        self.facebook_workers = max(1, facebook_workers)
+        self.queue_size = queue_size
+        self.facebook_cache = facebook_cache
+        self.render_fallback = render_fallback
+        self.fast = fast
+        self.blocker = blocker
+        self.store = store
+        self.refresh_older_than = refresh_older_than
+        self.place_links = []
+        self.enriched_websites = set()
+        self.counts = {'places': 0, 'stored': 0, 'websites': 0, 'facebook': 0, 'rendered': 0}
+        # Resumed work; websites map to what the social stage needs from them
+        self._completed_places = checkpoint.completed_places()
+        self._done_websites = {line['website']: self._social_jobs(line['website'], line['data'])
+                               for line in checkpoint.website_results()}
+        self._done_social = {('facebook', link) for link in checkpoint.facebook_emails()}
+        self._done_social.update(('rendered', website) for website in checkpoint.rendered_emails())
+        self._seen_keys = set()
+        self._seen_websites = set()
+        self._seen_social = set()
+
+    def _social_jobs(self, website: str, data: Dict) -> List[Tuple[str, str]]:
+        jobs = [('facebook', link) for link in data['social_media'].get('facebook', [])]
+        if self.render_fallback and needs_render(website, data):
+            jobs.append(('rendered', website))
+        return jobs
+
+    async def _put_jobs(self, queue: asyncio.Queue, jobs: List[Tuple[str, str]]):
+        for job in jobs:
+            if job in self._seen_social or job in self._done_social:
+                continue
+            self._seen_social.add(job)
+            if job[0] == 'facebook' and self.facebook_cache and self.facebook_cache.get(job[1]) is not None:
+                # main() reads cached pages back when it builds email_1
+                continue
+            await queue.put(job)
+
+    async def _discover(self, browser, places: asyncio.Queue):
+        async def forward(hrefs):
+            for href in hrefs:
+                key = place_key(href)
+                if key in self._seen_keys:
+                    continue
+                self._seen_keys.add(key)
+                self.place_links.append(href)
+                if (self.store and self.refresh_older_than is not None and href not in self._completed_places
+                        and self.store.recent_record(key, self.refresh_older_than)):
+                    # Recent in the place store: main() takes it and its website data from there
+                    self.counts['stored'] += 1
+                    continue
+                await places.put(href)
+
+        context = await browser.new_context(**VIEWPORT)
+        try:
+            page = await context.new_page()
+            if self.blocker:
+                await self.blocker.install_async(page)
+            with metrics.stage('discovery'):
+                await open_maps_async(page)
+                await search_maps_async(page, self.search_for)
+                await scroll_feed_async(page, self.total, on_links=forward)
+        finally:
+            await context.close()
+
+    async def _details(self, browser, places: asyncio.Queue, websites: asyncio.Queue):
+        async def scrape(page, href):
+            completed = self._completed_places.get(href)
+            return completed if completed is not None else await scrape_place(page, href)
+
+        async def forward(href, record):
+            if record == null_record():
+                # Left out of the checkpoint, so main() scrapes it again after the pipeline
+                return
+            if href not in self._completed_places:
+                self.checkpoint.record_place(href, record)
+                self.counts['places'] += 1
+                metrics.add_items('place_details')
+            website = record['Website']
+            if website in self._seen_websites:
+                return
+            self._seen_websites.add(website)
+            await websites.put(website)
+
+        with metrics.stage('place_details'):
+            await asyncio.gather(*(
+                page_worker(browser, places, scrape, 45, place_failed, forward, VIEWPORT,
+                            self.blocker.install_async if self.blocker else None)
+                for _ in range(self.detail_workers)
+            ))
+
+    async def _enrich(self, session, websites: asyncio.Queue, social: asyncio.Queue):
+        while True:
+            website = await websites.get()
+            if website is None:
+                return
+            jobs = self._done_websites.get(website)
+            if jobs is None:
+                data = await self.extractor.extract_structured_data_async(website, session)
+                self.checkpoint.record_website(website, data)
+                self.enriched_websites.add(website)
+                self.counts['websites'] += 1
+                metrics.add_items('website_enrichment')
+                jobs = self._social_jobs(website, data)
+            await self._put_jobs(social, jobs)
+
+    async def _enrich_all(self, session, websites: asyncio.Queue, social: asyncio.Queue):
+        # Plain tasks over the extractor's pooled session; its global and per-host limits still apply
+        with metrics.stage('website_enrichment'):
+            await asyncio.gather(*(self._enrich(session, websites, social) for _ in range(self.website_workers)))
+
+    async def _social(self, browser, social: asyncio.Queue):
+        async def visit(page, job):
+            kind, target = job
+            if kind == 'facebook':
+                return await fetch_facebook_email(page, target)
+            return await render_site_email(page, site_url(target))
+
+        def failed(job, error):
+            kind, target = job
+            return facebook_link_failed(target, error) if kind == 'facebook' else site_render_failed(site_url(target), error)
+
+        async def record(job, email):
+            kind, target = job
+            if email is None:
+                return
+            self.counts[kind] += 1
+            metrics.add_items('facebook' if kind == 'facebook' else 'rendered_websites')
+            if kind == 'facebook':
+                self.checkpoint.record_facebook(target, email)
+                if self.facebook_cache:
+                    self.facebook_cache.set(target, email)
+            else:
+                self.checkpoint.record_rendered(target, email)
+
+        with metrics.stage('facebook'):
+            await asyncio.gather(*(
+                page_worker(browser, social, visit, SOCIAL_TIMEOUT, failed, record, {'ignore_https_errors': True},
+                            self.blocker.install_async if self.blocker else None)
+                for _ in range(self.facebook_workers)
+            ))
+
+    async def _then_close(self, stage, queue: asyncio.Queue, consumers: int):
+        # Once a stage has drained, one None per downstream worker tells them to stop
+        await stage
+        for _ in range(consumers):
+            await queue.put(None)
+
+    async def run_async(self) -> Tuple[List[str], Set[str]]:
+        places = asyncio.Queue(self.queue_size)
+        websites = asyncio.Queue(self.queue_size)
+        social = asyncio.Queue(self.queue_size)
+        async with async_playwright() as p:
+            browser = await launch_browser(p, self.fast)
+            try:
+                async with self.extractor.open_session() as session:
+                    tasks = [asyncio.ensure_future(stage) for stage in (
+                        self._then_close(self._discover(browser, places), places, self.detail_workers),
+                        self._then_close(self._details(browser, places, websites), websites, self.website_workers),
+                        self._then_close(self._enrich_all(session, websites, social), social, self.facebook_workers),
+                        self._social(browser, social),
+                    )]
+                    try:
+                        await asyncio.gather(*tasks)
+                    finally:
+                        # A failed stage would leave its neighbours waiting on their queues forever
+                        for task in tasks:
+                            task.cancel()
+            finally:
+                await browser.close()
+        return self.place_links, self.enriched_websites
+
+    def run(self) -> Tuple[List[str], Set[str]]:
+        place_links, enriched = run_async(self.run_async())
+        print(f"Pipeline: {len(place_links)} places found, {self.counts['places']} scraped, "
+              f"{self.counts['stored']} recent in the place store, {self.counts['websites']} websites, "
+              f"{self.counts['facebook']} Facebook pages, {self.counts['rendered']} rendered sites")
+        return place_links, enriched
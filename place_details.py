@@ -0,0 +1,160 @@
+import argparse
+import json
+from typing import Callable, Dict, List, Optional
+from playwright.async_api import async_playwright
+from async_browser import map_pages, run_async
+from browser_profile import ResourceBlocker, launch_browser
+from maps_payload import parse_opens_at
+from rate_limiter import limiter
+from run_metrics import metrics
+
+PLACE_XPATHS = {
+    'name': '//div[@class="TIHn2 "]//h1[@class="DUwDvf lfPIob"]',
+    'address': '//button[@data-item-id="address"]//div[contains(@class, "fontBodyMedium")]',
+    'website': '//a[@data-item-id="authority"]//div[contains(@class, "fontBodyMedium")]',
+    'phone': '//button[contains(@data-item-id, "phone:tel:")]//div[contains(@class, "fontBodyMedium")]',
+    'reviews_count': '//div[@class="TIHn2 "]//div[@class="fontBodyMedium dmRWX"]//div//span//span//span[@aria-label]',
+    'reviews_average': '//div[@class="TIHn2 "]//div[@class="fontBodyMedium dmRWX"]//div//span[@aria-hidden]',
+    'intro': '//div[@class="WeS02d fontBodyMedium"]//div[@class="PYvSYb "]',
+    'info1': '//div[@class="LTs0Rc"][1]',
+    'info2': '//div[@class="LTs0Rc"][2]',
+    'info3': '//div[@class="LTs0Rc"][3]',
+    'opens_at': '//button[contains(@data-item-id, "oh")]//div[contains(@class, "fontBodyMedium")]',
+    'opens_at2': '//div[@class="MkV9"]//span[@class="ZDu9vd"]//span[2]',
+    'place_type': '//div[@class="LBgpqf"]//button[@class="DkEaL "]',
+}
+
+# Resolves every xpath inside the browser and returns one {key: innerText or null} record,
+# replacing a count() + inner_text() round-trip per field
+PLACE_EXTRACTION_JS = """
+(xpaths) => {
+    const record = {};
+    for (const [key, xpath] of Object.entries(xpaths)) {
+        const node = document.evaluate(xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+        record[key] = node ? node.innerText : null;
+    }
+    return record;
+}
+"""
+
+# Each info row checks the service keywords in its own priority order
+INFO_ROW_KEYWORDS = {
+    'info1': ('shop', 'pickup', 'delivery'),
+    'info2': ('pickup', 'shop', 'delivery'),
+    'info3': ('delivery', 'pickup', 'shop'),
+}
+
+def null_record() -> Dict:
+    return {
+        'Names': "Null",
+        'Website': "Null",
+        'Introduction': "Null",
+        'Phone Number': "Null",
+        'Address': "Null",
+        'Review Count': 0,
+        'Average Review Count': 0.0,
+        'Store Shopping': "No",
+        'In Store Pickup': "No",
+        'Delivery': "No",
+        'Type': "Null",
+        'Opens At': "Null"
+    }
+
+def parse_place_record(record: Dict) -> Dict:
+    reviews_count = 0
+    if record.get('reviews_count') is not None:
+        temp = record['reviews_count'].replace('(', '').replace(')', '').replace(',', '')
+        reviews_count = int(temp)
+
+    reviews_average = 0.0
+    if record.get('reviews_average') is not None:
+        temp = record['reviews_average'].replace(' ', '').replace(',', '.')
+        reviews_average = float(temp)
+
+    services = {'shop': "No", 'pickup': "No", 'delivery': "No"}
+    for row, keywords in INFO_ROW_KEYWORDS.items():
+        if record.get(row) is None:
+            continue
+        temp = record[row].split('·')
+        if len(temp) > 1:
+            check = temp[1].replace("\n", "").lower()
+            for keyword in keywords:
+                if keyword in check:
+                    services[keyword] = "Yes"
+                    break
+
+    opens_at = ""
+    if record.get('opens_at') is not None:
+        opens_at = parse_opens_at(record['opens_at'])
+    elif record.get('opens_at2') is not None:
+        opens_at = parse_opens_at(record['opens_at2'])
+
+    return {
+        'Names': record.get('name') or "",
+        'Website': record.get('website') or "",
+        'Introduction': record['intro'] if record.get('intro') is not None else "None Found",
+        'Phone Number': record.get('phone') or "",
+        'Address': record.get('address') or "",
+        'Review Count': reviews_count,
+        'Average Review Count': reviews_average,
+        'Store Shopping': services['shop'],
+        'In Store Pickup': services['pickup'],
+        'Delivery': services['delivery'],
+        'Type': record.get('place_type') or "",
+        'Opens At': opens_at
+    }
+
+def extract_place_details(page) -> Dict:
+    return parse_place_record(page.evaluate(PLACE_EXTRACTION_JS, PLACE_XPATHS))
+
+async def scrape_place(page, href: str) -> Dict:
+    with metrics.timer('place_detail_seconds'):
+        await limiter.goto_async(page, href, timeout=60000)
+        await page.wait_for_selector(PLACE_XPATHS['name'])
+        try:
+            # The contact rows render just after the title; places without an address simply time out here
+            await page.wait_for_selector(PLACE_XPATHS['address'], timeout=3000)
+        except Exception:
+            pass
+        return parse_place_record(await page.evaluate(PLACE_EXTRACTION_JS, PLACE_XPATHS))
+
+def place_failed(href: str, error: Exception) -> Dict:
+    print(f"Null scraping listing: {str(error) or type(error).__name__}")
+    metrics.count_error('place_details', error)
+    return null_record()
+
+async def scrape_place_details_async(hrefs: List[str], workers: int = 4, timeout: float = 45, fast: bool = False,
+                                     on_result: Optional[Callable[[int, str, Dict], None]] = None,
+                                     blocker: Optional[ResourceBlocker] = None) -> List[Dict]:
+    async with async_playwright() as p:
+        browser = await launch_browser(p, fast)
+        try:
+            return await map_pages(
+                browser, hrefs, scrape_place, workers, timeout, place_failed,
+                context_options={'viewport': {"width": 1920, "height": 1080}},
+                setup_page=blocker.install_async if blocker else None,
+                desc="Scraping place details", on_result=on_result
+            )
+        finally:
+            await browser.close()
+
+def scrape_place_details(hrefs: List[str], workers: int = 4, timeout: float = 45, fast: bool = False,
+                         on_result: Optional[Callable[[int, str, Dict], None]] = None,
+                         blocker: Optional[ResourceBlocker] = None) -> List[Dict]:
+    return run_async(scrape_place_details_async(hrefs, workers, timeout, fast, on_result, blocker))
+
+if __name__ == "__main__":
+    from playwright.sync_api import sync_playwright
+
+    parser = argparse.ArgumentParser(description="Run the place-panel extraction script against a saved HTML file")
+    parser.add_argument("html_file", type=str)
+    args = parser.parse_args()
+
+    with open(args.html_file, encoding='utf-8') as f:
+        html = f.read()
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        page = browser.new_page()
+        page.set_content(html)
+        print(json.dumps(extract_place_details(page), indent=2, ensure_ascii=False))
+        browser.close()
@@ -0,0 +1,91 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+from maps_payload import place_id_from_url
+
+DEFAULT_STORE_PATH = 'places.sqlite'
+
+def place_key(href: str) -> str:
+    # The Maps data id ("0x...:0x...") when the link carries one, else the /maps/place URL
+    # without its viewport, data blob and query string
+    place_id = place_id_from_url(href)
+    if place_id:
+        return place_id
+    canonical = href.split('?')[0].split('/data=')[0].split('/@')[0]
+    return canonical.rstrip('/')
+
+def fingerprint(record: Dict) -> str:
+    return hashlib.sha1(json.dumps(record, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+# Places from every run, keyed by place_key(), with the scraped fields, their fingerprint and
+# when they were last scraped, plus the website data enriched for them
+class PlaceStore:
+    def __init__(self, path: str = DEFAULT_STORE_PATH):
+        self.path = path
+        # Website results arrive from the async enrichment thread, so access is serialized by a
+        # lock; batch jobs in other processes can share the file, hence the long busy timeout
+        self._lock = threading.RLock()
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        with self._lock, self._connection:
+            self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS places (
+                    place_key TEXT PRIMARY KEY,
+                    place_url TEXT,
+                    name TEXT,
+                    fields TEXT,
+                    fingerprint TEXT,
+                    last_scraped REAL,
+                    website TEXT,
+                    website_data TEXT,
+                    website_scraped REAL
+                )
+            """)
+
+    def get(self, key: str) -> Optional[sqlite3.Row]:
+        with self._lock:
+            return self._connection.execute("SELECT * FROM places WHERE place_key = ?", (key,)).fetchone()
+
+    def recent_record(self, key: str, max_age_hours: float) -> Optional[Dict]:
+        row = self.get(key)
+        if row is None or time.time() - row['last_scraped'] >= max_age_hours * 3600:
+            return None
+        return json.loads(row['fields'])
+
+    def save_place(self, key: str, place_url: str, record: Dict) -> bool:
+        # Returns True when the place is new or any scraped field differs from the stored copy
+        row = self.get(key)
+        new_fingerprint = fingerprint(record)
+        with self._lock, self._connection:
+            if row is None:
+                self._connection.execute(
+                    "INSERT INTO places (place_key, place_url, name, fields, fingerprint, last_scraped) VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, place_url, record.get('Names'), json.dumps(record, ensure_ascii=False), new_fingerprint, time.time())
+                )
+            else:
+                self._connection.execute(
+                    "UPDATE places SET place_url = ?, name = ?, fields = ?, fingerprint = ?, last_scraped = ? WHERE place_key = ?",
+                    (place_url, record.get('Names'), json.dumps(record, ensure_ascii=False), new_fingerprint, time.time(), key)
+                )
+        return row is None or row['fingerprint'] != new_fingerprint
+
+    def website_data(self, key: str, website: str) -> Optional[Dict]:
+        row = self.get(key)
+        if row is None or row['website_data'] is None or row['website'] != website:
+            return None
+        return json.loads(row['website_data'])
+
+    def save_website(self, key: str, website: str, data: Dict):
+        with self._lock, self._connection:
+            self._connection.execute(
+                "UPDATE places SET website = ?, website_data = ?, website_scraped = ? WHERE place_key = ?",
+                (website, json.dumps(data, ensure_ascii=False), time.time(), key)
+            )
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
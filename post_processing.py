@@ -0,0 +1,76 @@
+from typing import Dict, Iterable, List
+
+import pandas as pd
+
+SOCIAL_COLUMNS = {
+    'Facebook': 'facebook',
+    'Instagram': 'instagram',
+    'Twitter': 'twitter',
+    'Linkedin': 'linkedin',
+    'Youtube': 'youtube',
+}
+ADDRESS_COLUMNS = ['Street', 'City', 'State', 'Postal Code']
+
+def _joined(lists: pd.Series) -> pd.Series:
+    # ', '-joined list values, 'N/A' for missing or empty lists
+    joined = lists.str.join(', ')
+    return joined.where(lists.str.len() > 0, 'N/A').fillna('N/A')
+
+# The CSV columns taken from the per-row website data, built column by column with pandas
+# string accessors (which also index into dicts and lists) instead of a Python pass per column
+def website_columns(website_data: List[Dict], index: pd.Index) -> pd.DataFrame:
+    data = pd.Series(website_data, index=index, dtype=object)
+    contact = data.str.get('contact_info')
+    social = data.str.get('social_media')
+    emails = contact.str.get('emails')
+    columns = {
+        'Email': emails.str.get(0).where(emails.str.len() > 0, 'N/A').fillna('N/A'),
+        'Additional_Phones': _joined(contact.str.get('phones')),
+    }
+    for column, network in SOCIAL_COLUMNS.items():
+        columns[column] = _joined(social.str.get(network))
+    hours = data.str.get('business_hours')
+    columns['Business_Hours'] = hours.astype(str).where(hours.str.len() > 0, 'N/A').fillna('N/A')
+    return pd.DataFrame(columns, index=index)
+
+# "street, city, STATE POSTAL ..." split into the four address columns; missing parts are None
+def split_addresses(addresses: pd.Series) -> pd.DataFrame:
+    addresses = addresses.astype('string').replace('', pd.NA)
+    parts = addresses.str.split(', ', expand=True).reindex(columns=range(3)).astype('string')
+    region = parts[2].str.split(' ', expand=True).reindex(columns=range(2)).astype('string')
+    result = pd.DataFrame({
+        'Street': parts[0],
+        'City': parts[1],
+        'State': region[0],
+        'Postal Code': region[1],
+    }, index=addresses.index).astype(object)
+    return result.where(result.notna(), None)
+
+def search_queries(search_for: str, postal_codes: pd.Series, cities: pd.Series, states: pd.Series) -> pd.Series:
+    # Missing parts read "None", as they did when the query was formatted row by row
+    def text(values):
+        return values.astype(object).where(values.notna(), 'None').astype(str)
+
+    prefix = search_for.split('in')[0].strip()
+    return prefix + ', ' + text(postal_codes) + ', ' + text(cities) + ', ' + text(states) + ', US'
+
+def clean_emails(emails: pd.Series) -> pd.Series:
+    missing = emails.isna() | (emails == 'N/A')
+    cleaned = emails.astype(str).str.lower().str.replace(r'[^a-z@.]', '', regex=True)
+    return cleaned.where(~missing, 'N/A')
+
+def facebook_email_column(facebook_links: pd.Series, emails: Dict[str, str]) -> pd.Series:
+    # Per row, the email of its last Facebook link that has one
+    links = facebook_links.str.split(', ').explode()
+    found = links.map(emails)
+    found = found[found.notna() & (found != 'N/A')]
+    column = pd.Series('N/A', index=facebook_links.index, dtype=object)
+    if not found.empty:
+        last = found.groupby(level=0).last()
+        column.loc[last.index] = last
+    return column
+
+def drop_constant_columns(df: pd.DataFrame, keep: Iterable[str] = ()) -> pd.DataFrame:
+    counts = df.nunique()
+    constant = [column for column in df.columns if counts[column] == 1 and column not in keep]
+    return df.drop(columns=constant)
@@ -0,0 +1,256 @@
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+from urllib.parse import urlparse
+
+from run_metrics import metrics
+
+THROTTLE_STATUSES = (429, 503)
+
+# Raised instead of sending a request to a host whose circuit breaker is open
+class HostUnavailable(Exception):
+    pass
+
+# A host still answered 429 or 5xx after every retry
+class HostError(Exception):
+    def __init__(self, host: str, status: int):
+        super().__init__(f"{host} answered {status}")
+        self.host = host
+        self.status = status
+
+def host_of(url: str) -> str:
+    return (urlparse(url if '://' in url else 'https://' + url).hostname or '').lower()
+
+def retryable_status(status: Optional[int]) -> bool:
+    return status is not None and (status == 429 or status >= 500)
+
+def _retry_after(headers) -> Optional[float]:
+    value = (headers or {}).get('retry-after') or (headers or {}).get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+class _HostState:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.not_before = 0.0
+        self.latency = None
+        self.failures = 0
+        self.open_until = 0.0
+        self.probing = False
+
+# One token bucket per host. Each request takes a token, and requests beyond the bucket are
+# scheduled at the host's current rate. The rate follows AIMD: every healthy response adds
+# `increase` requests/s up to `max_rate`, while a 429/503, a 5xx, a timeout or a response much
+# slower than usual multiplies it by `decrease`. After `failure_threshold` failures in a row the
+# host's circuit opens for `open_seconds`: requests to it fail at once, then a single probe
+# decides whether it closes again. A host the whole run depends on (`keep_open`) never has its
+# circuit opened, since every item after it would fail at once; its requests are held back with
+# growing backoff instead, then sent. Hosts idle for `idle_seconds` are forgotten (and start over
+# at `initial_rate`), so a long-lived process does not keep one entry per host it ever saw.
+# Thread-safe, and shared by sync and async callers.
+class RateLimiter:
+    def __init__(self, initial_rate: float = 2.0, min_rate: float = 0.2, max_rate: float = 10.0, burst: float = 2.0,
+                 increase: float = 0.25, decrease: float = 0.5, slow_seconds: float = 10.0, failure_threshold: int = 5,
+                 open_seconds: float = 300.0, base_backoff: float = 1.0, max_backoff: float = 60.0,
+                 idle_seconds: float = 900.0, essential_hosts: Iterable[str] = ()):
+        self.configure(essential_hosts=set(essential_hosts), initial_rate=initial_rate, min_rate=min_rate, max_rate=max_rate, burst=burst, increase=increase,
+                       decrease=decrease, slow_seconds=slow_seconds, failure_threshold=failure_threshold,
+                       open_seconds=open_seconds, base_backoff=base_backoff, max_backoff=max_backoff,
+                       idle_seconds=idle_seconds)
+
+    def configure(self, **settings):
+        # Replaces the given settings and forgets every host's state
+        for name, value in settings.items():
+            setattr(self, name, value)
+        self._lock = threading.Lock()
+        self.hosts: Dict[str, _HostState] = {}
+        self._pruned_at = time.monotonic()
+
+    def keep_open(self, url: str):
+        self.essential_hosts.add(host_of(url))
+
+    def _state(self, host: str) -> _HostState:
+        state = self.hosts.get(host)
+        if state is None:
+            self._prune()
+            state = self.hosts[host] = _HostState(min(self.initial_rate, self.max_rate), self.burst)
+        return state
+
+    def _prune(self):
+        # At most once a minute; a paused host is kept until its breaker has closed
+        now = time.monotonic()
+        if now - self._pruned_at < 60:
+            return
+        self._pruned_at = now
+        for host in [host for host, state in self.hosts.items()
+                     if now - state.updated > self.idle_seconds and now >= state.open_until and not state.probing]:
+            del self.hosts[host]
+
+    def reserve(self, host: str) -> float:
+        # Takes a token and returns how long to wait before sending
+        with self._lock:
+            state = self._state(host)
+            now = time.monotonic()
+            if now < state.open_until or state.probing:
+                metrics.increment('breaker_rejections')
+                raise HostUnavailable(f"{host} is unavailable after repeated failures")
+            if state.open_until:
+                # The breaker's timeout passed: this request is the probe
+                state.probing = True
+            state.tokens = min(self.burst, state.tokens + (now - state.updated) * state.rate)
+            state.updated = now
+            state.tokens -= 1
+            delay = max(-state.tokens / state.rate, state.not_before - now, 0.0)
+        if delay:
+            metrics.observe('rate_limit_wait_seconds', delay, host)
+        return delay
+
+    def record(self, host: str, seconds: float, status: Optional[int] = None, error: Optional[BaseException] = None,
+               retry_after: Optional[float] = None):
+        with self._lock:
+            state = self._state(host)
+            now = time.monotonic()
+            failed = error is not None or retryable_status(status)
+            slow = state.latency is not None and seconds > max(self.slow_seconds, 3 * state.latency)
+            if failed or slow:
+                state.rate = max(self.min_rate, state.rate * self.decrease)
+            else:
+                state.rate = min(self.max_rate, state.rate + self.increase)
+            if error is None:
+                state.latency = seconds if state.latency is None else 0.8 * state.latency + 0.2 * seconds
+            if status in THROTTLE_STATUSES:
+                metrics.increment('throttled_responses')
+                if retry_after:
+                    state.not_before = max(state.not_before, now + retry_after)
+            if not failed:
+                state.failures = 0
+                state.open_until = 0.0
+                state.probing = False
+                return
+            state.failures += 1
+            if host in self.essential_hosts:
+                if state.failures >= self.failure_threshold:
+                    pause = self.backoff(state.failures - self.failure_threshold)
+                    state.not_before = max(state.not_before, now + pause)
+                    metrics.increment('essential_host_backoffs')
+                    print(f"{host} failed {state.failures} times in a row; holding its requests back for {pause:.0f}s")
+                return
+            if state.probing or state.failures >= self.failure_threshold:
+                state.open_until = now + self.open_seconds
+                state.probing = False
+                metrics.increment('breaker_trips')
+                print(f"{host} failed {state.failures} times in a row; pausing it for {self.open_seconds:.0f}s")
+
+    def backoff(self, attempt: int) -> float:
+        # Exponential with equal jitter, so retries from many workers do not line up
+        delay = min(self.max_backoff, self.base_backoff * 2 ** min(attempt, 16))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def release_probe(self, host: str):
+        # A probe cancelled before it was sent decides nothing; the next request probes instead
+        with self._lock:
+            self._state(host).probing = False
+
+    def wait(self, host: str):
+        delay = self.reserve(host)
+        if delay:
+            try:
+                time.sleep(delay)
+            except BaseException:
+                self.release_probe(host)
+                raise
+
+    async def wait_async(self, host: str):
+        delay = self.reserve(host)
+        if delay:
+            try:
+                await asyncio.sleep(delay)
+            except BaseException:
+                self.release_probe(host)
+                raise
+
+    def _settle(self, host: str, started: float, result: Any, inspect, attempt: int, retries: int) -> bool:
+        # Records a response; True when it should be retried
+        status, headers = inspect(result) if inspect else (None, None)
+        self.record(host, time.perf_counter() - started, status, retry_after=_retry_after(headers))
+        if not retryable_status(status):
+            return False
+        if attempt == retries:
+            raise HostError(host, status)
+        return True
+
+    # Sends `send()` through the host's bucket, retrying errors and 429/5xx answers up to
+    # `retries` times with backoff. `inspect(result)` returns (status, headers) of a result.
+    def call(self, url: str, send: Callable[[], Any], inspect: Optional[Callable[[Any], Tuple]] = None,
+             retries: int = 2, retry_counter: str = 'fetch_retries') -> Any:
+        host = host_of(url)
+        for attempt in range(retries + 1):
+            self.wait(host)
+            started = time.perf_counter()
+            try:
+                result = send()
+            except Exception as e:
+                self.record(host, time.perf_counter() - started, error=e)
+                if attempt == retries:
+                    raise
+            except BaseException as e:
+                # A caller's timeout cancelled the request: still a failure, and a probe must not stay pending
+                self.record(host, time.perf_counter() - started, error=e)
+                raise
+            else:
+                if not self._settle(host, started, result, inspect, attempt, retries):
+                    return result
+            metrics.increment(retry_counter)
+            time.sleep(self.backoff(attempt))
+
+    async def call_async(self, url: str, send: Callable[[], Awaitable[Any]], inspect: Optional[Callable[[Any], Tuple]] = None,
+                         retries: int = 2, retry_counter: str = 'fetch_retries') -> Any:
+        host = host_of(url)
+        for attempt in range(retries + 1):
+            await self.wait_async(host)
+            started = time.perf_counter()
+            try:
+                result = await send()
+            except Exception as e:
+                self.record(host, time.perf_counter() - started, error=e)
+                if attempt == retries:
+                    raise
+            except BaseException as e:
+                # A caller's timeout cancelled the request: still a failure, and a probe must not stay pending
+                self.record(host, time.perf_counter() - started, error=e)
+                raise
+            else:
+                if not self._settle(host, started, result, inspect, attempt, retries):
+                    return result
+            metrics.increment(retry_counter)
+            await asyncio.sleep(self.backoff(attempt))
+
+    # Browser navigations; map_pages already replaces a failed page, so they are not retried by default
+    def goto(self, page, url: str, retries: int = 0, **options):
+        return self.call(url, lambda: page.goto(url, **options), _page_response, retries, 'navigation_retries')
+
+    async def goto_async(self, page, url: str, retries: int = 0, **options):
+        return await self.call_async(url, lambda: page.goto(url, **options), _page_response, retries, 'navigation_retries')
+
+    def report(self) -> Dict:
+        with self._lock:
+            return {host: {'rate': round(state.rate, 2), 'failures': state.failures, 'open': state.open_until > time.monotonic()}
+                    for host, state in self.hosts.items()}
+
+def _page_response(response) -> Tuple[Optional[int], Optional[Dict]]:
+    # goto returns None for same-document navigations
+    return (response.status, response.headers) if response is not None else (None, None)
+
+limiter = RateLimiter()
@@ -0,0 +1,93 @@
+import time
+from typing import Callable, Dict, List, Optional
+
+from playwright.async_api import async_playwright
+
+from async_browser import map_pages, run_async
+from browser_profile import ResourceBlocker, launch_browser
+from contact_scanner import first_email
+from rate_limiter import limiter
+from run_metrics import metrics
+
+MAX_CONTACT_LINKS = 3
+
+# Resolves once the page shows an address or a mailto link, or has finished loading
+READY_JS = """
+() => document.querySelector('a[href^="mailto:"]') !== null
+    || (document.body !== null && document.body.innerText.includes('@'))
+    || document.readyState === 'complete'
+"""
+
+# Same link texts the Node pass looked for
+CONTACT_LINKS_JS = """
+() => Array.from(document.querySelectorAll('a[href]'))
+    .filter(link => /contact|about|get in touch|reach us/i.test(link.textContent || ''))
+    .map(link => link.href)
+    .filter(href => href.startsWith('http'))
+"""
+
+async def _page_email(page, url: str) -> Optional[str]:
+    await limiter.goto_async(page, url, timeout=30000, wait_until='domcontentloaded')
+    try:
+        await page.wait_for_function(READY_JS, timeout=8000)
+    except Exception:
+        pass
+    return first_email(await page.content())
+
+async def render_site_email(page, url: str) -> str:
+    # Homepage first, then its contact/about pages, stopping at the first email
+    started = time.perf_counter()
+    email = await _page_email(page, url)
+    if email is None:
+        for link in list(dict.fromkeys(await page.evaluate(CONTACT_LINKS_JS)))[:MAX_CONTACT_LINKS]:
+            try:
+                email = await _page_email(page, link)
+            except Exception as e:
+                print(f"Error processing contact link on {url}: {str(e) or type(e).__name__}")
+                continue
+            if email:
+                break
+    metrics.observe('rendered_site_seconds', time.perf_counter() - started)
+    return email or 'N/A'
+
+def site_render_failed(url: str, error: Exception) -> Optional[str]:
+    print(f"Error rendering {url}: {str(error) or type(error).__name__}")
+    metrics.count_error('rendered', error)
+    return None
+
+def site_url(website: str) -> str:
+    return website if website.startswith(('http://', 'https://')) else 'https://' + website
+
+async def _render_async(urls: List[str], workers: int, timeout: float, fast: bool,
+                        blocker: Optional[ResourceBlocker], on_result) -> List[Optional[str]]:
+    async with async_playwright() as p:
+        browser = await launch_browser(p, fast)
+        try:
+            return await map_pages(
+                browser, urls, render_site_email, workers, timeout, site_render_failed,
+                context_options={'ignore_https_errors': True},
+                setup_page=blocker.install_async if blocker else None,
+                desc="Rendering websites", on_result=on_result
+            )
+        finally:
+            await browser.close()
+
+# The browser tier of website enrichment: every website gets one shared browser and a pool of
+# `workers` pages. Returns website -> first email ('N/A' when none); sites that fail to load are
+# left out.
+def render_emails(websites: List[str], workers: int = 4, timeout: float = 90, fast: bool = False,
+                  blocker: Optional[ResourceBlocker] = None,
+                  on_result: Optional[Callable[[str, str], None]] = None) -> Dict[str, str]:
+    websites = list(dict.fromkeys(websites))
+    emails = {}
+
+    def store(index, url, email):
+        if email is None:
+            return
+        emails[websites[index]] = email
+        if on_result:
+            on_result(websites[index], email)
+
+    if websites:
+        run_async(_render_async([site_url(website) for website in websites], workers, timeout, fast, blocker, store))
+    return emails
@@ -0,0 +1,37 @@
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+# Small persistent key -> value cache with a TTL, backed by one SQLite file
+class ResultCache:
+    def __init__(self, path: str, ttl: float = 7 * 24 * 3600, table: str = 'results'):
+        self.path = path
+        self.ttl = ttl
+        self.table = table
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, value TEXT, stored_at REAL)"
+            )
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._connection.execute(
+                f"SELECT value, stored_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or time.time() - row[1] >= self.ttl:
+            return None
+        return row[0]
+
+    def set(self, key: str, value: str):
+        with self._lock, self._connection:
+            self._connection.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, stored_at) VALUES (?, ?, ?)",
+                (key, value, time.time())
+            )
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
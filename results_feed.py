@@ -0,0 +1,116 @@
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from rate_limiter import limiter
+
+MAPS_URL = "https://www.google.com/maps"
+SEARCH_BOX_XPATH = '//input[@id="searchboxinput"]'
+PLACE_LINK_XPATH = '//a[contains(@href, "https://www.google.com/maps/place")]'
+
+# Every listing of a run is opened on this host, so failures there slow it down instead of pausing it
+limiter.keep_open(MAPS_URL)
+
+# Scrolls the results feed to its bottom, then waits on a MutationObserver until anchors
+# beyond `known` appear, the end-of-list marker shows up, or `timeout` ms pass. Only the
+# hrefs that are new since the previous round are sent back.
+FEED_SCROLL_JS = """
+async ({known, timeout}) => {
+    const selector = 'a[href*="https://www.google.com/maps/place"]';
+    const feed = document.querySelector('div[role="feed"]');
+    const count = () => document.querySelectorAll(selector).length;
+    const endReached = () => !!document.querySelector('span.HlvSq')
+        || (feed !== null && feed.innerText.includes("reached the end of the list"));
+    if (feed) {
+        feed.scrollTop = feed.scrollHeight;
+    } else {
+        window.scrollBy(0, 10000);
+    }
+    if (count() <= known && !endReached()) {
+        await new Promise(resolve => {
+            const observer = new MutationObserver(() => {
+                if (count() > known || endReached()) done();
+            });
+            const timer = setTimeout(done, timeout);
+            function done() {
+                observer.disconnect();
+                clearTimeout(timer);
+                resolve();
+            }
+            observer.observe(feed || document.body, {childList: true, subtree: true});
+        });
+    }
+    const anchors = Array.from(document.querySelectorAll(selector));
+    return {
+        hrefs: anchors.slice(known).map(anchor => anchor.getAttribute('href')),
+        end: endReached()
+    };
+}
+"""
+
+def discover_place_links(page, total: int, min_idle_ms: int = 1000, max_idle_ms: int = 8000) -> List[str]:
+    page.wait_for_selector(PLACE_LINK_XPATH)
+    hrefs = []
+    idle_ms = min_idle_ms
+    while len(hrefs) < total:
+        result = page.evaluate(FEED_SCROLL_JS, {'known': len(hrefs), 'timeout': idle_ms})
+        if result['hrefs']:
+            hrefs.extend(result['hrefs'])
+            print(f"Currently Found: {len(hrefs)}")
+            idle_ms = min_idle_ms
+        if result['end']:
+            print(f"Reached the end of the list. Found {len(hrefs)} results.")
+            break
+        if not result['hrefs']:
+            # Back off while the feed is quiet; give up once even the longest wait brings nothing
+            if idle_ms >= max_idle_ms:
+                print(f"No new results found, stopping scroll. Found {len(hrefs)} results.")
+                break
+            idle_ms = min(idle_ms * 2, max_idle_ms)
+    return hrefs[:total]
+
+# The same scroll loop for async pages, without progress output since several feeds may scroll
+# at once. Also reports whether Maps marked the end of the list, which a capped feed never does.
+# `on_links` is awaited with every new batch, so a consumer that blocks it also pauses scrolling.
+async def scroll_feed_async(page, limit: int, min_idle_ms: int = 1000, max_idle_ms: int = 8000,
+                            on_links: Optional[Callable[[List[str]], Awaitable[None]]] = None) -> Tuple[List[str], bool]:
+    await page.wait_for_selector(PLACE_LINK_XPATH)
+    hrefs = []
+    idle_ms = min_idle_ms
+    while len(hrefs) < limit:
+        result = await page.evaluate(FEED_SCROLL_JS, {'known': len(hrefs), 'timeout': idle_ms})
+        if result['hrefs']:
+            if on_links:
+                await on_links(result['hrefs'][:limit - len(hrefs)])
+            hrefs.extend(result['hrefs'])
+            idle_ms = min_idle_ms
+        if result['end']:
+            return hrefs[:limit], True
+        if not result['hrefs']:
+            if idle_ms >= max_idle_ms:
+                break
+            idle_ms = min(idle_ms * 2, max_idle_ms)
+    return hrefs[:limit], False
+
+# Loads Maps and waits for its search box instead of a fixed delay. Kept apart from the search
+# so callers can hook the page (network capture) before any results load.
+def open_maps(page):
+    limiter.goto(page, MAPS_URL, timeout=60000)
+    page.wait_for_selector(SEARCH_BOX_XPATH)
+
+def search_maps(page, query: str):
+    search_box = page.locator(SEARCH_BOX_XPATH)
+    search_box.fill(query)
+    search_box.press("Enter")
+
+async def open_maps_async(page):
+    await limiter.goto_async(page, MAPS_URL, timeout=60000)
+    await page.wait_for_selector(SEARCH_BOX_XPATH)
+
+async def search_maps_async(page, query: str):
+    search_box = page.locator(SEARCH_BOX_XPATH)
+    await search_box.fill(query)
+    await search_box.press("Enter")
+
+def listing_locators(page, count: int) -> List:
+    # The feed only ever appends, so the nth anchor stays the nth discovered listing
+    anchors = page.locator(PLACE_LINK_XPATH)
+    return [anchors.nth(index).locator("xpath=..") for index in range(count)]
@@ -0,0 +1,216 @@
+import bisect
+import json
+import os
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+# Upper bounds (seconds) of the histogram buckets exported to Prometheus
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+def error_category(error: BaseException) -> str:
+    # asyncio.wait_for raises a bare TimeoutError; Playwright and aiohttp name their own
+    return type(error).__name__ or 'Exception'
+
+def label_text(**labels) -> str:
+    pairs = ','.join(f'{key}="{_escape_label(value)}"' for key, value in labels.items() if value != '')
+    return '{' + pairs + '}' if pairs else ''
+
+def _escape_label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _quantile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+# Count, sum, max and bucket counts cover every sample; the quantiles come from `values`, which
+# keeps every sample of a run, or only the last `window` ones in a long-lived process
+class _Histogram:
+    def __init__(self, window: Optional[int] = None):
+        self.values = deque(maxlen=window) if window else []
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.bucket_counts = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def observe(self, value: float):
+        self.values.append(value)
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        self.bucket_counts[bisect.bisect_left(LATENCY_BUCKETS, value)] += 1
+
+    def summary(self) -> Dict:
+        if not self.count:
+            return {'count': 0}
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 4),
+            'mean': round(self.sum / self.count, 4),
+            'p50': round(_quantile(self.values, 0.5), 4),
+            'p90': round(_quantile(self.values, 0.9), 4),
+            'p99': round(_quantile(self.values, 0.99), 4),
+            'max': round(self.max, 4),
+        }
+
+    def buckets(self) -> List:
+        cumulative, buckets = 0, []
+        for bound, count in zip(LATENCY_BUCKETS, self.bucket_counts):
+            cumulative += count
+            buckets.append((bound, cumulative))
+        return buckets
+
+# Stage wall times and item counts, latency histograms (optionally per label such as a host),
+# counters, error categories and bytes fetched for one run. Stages record from several threads
+# (the async stages run on a helper thread), so every update takes the lock.
+class RunMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.window = None
+        self.max_labels = None
+        self.reset()
+
+    def bound(self, window: int = 1000, max_labels: int = 50):
+        # For processes that never finish a run: quantiles over the last `window` samples, and
+        # labels past `max_labels` per histogram (hosts, mostly) folded into 'other'
+        self.window = window
+        self.max_labels = max_labels
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started_at = time.time()
+            self.stages = {}
+            self.histograms = defaultdict(lambda: defaultdict(lambda: _Histogram(self.window)))
+            self.counters = Counter()
+            self.errors = defaultdict(Counter)
+            self.bytes = Counter()
+
+    @contextmanager
+    def stage(self, name: str, items: Optional[int] = None):
+        start = time.perf_counter()
+        with self._lock:
+            entry = self.stages.setdefault(name, {'seconds': 0.0, 'items': 0})
+        try:
+            yield entry
+        finally:
+            with self._lock:
+                entry['seconds'] += time.perf_counter() - start
+                if items is not None:
+                    entry['items'] += items
+
+    def add_items(self, stage: str, count: int = 1):
+        with self._lock:
+            self.stages.setdefault(stage, {'seconds': 0.0, 'items': 0})['items'] += count
+
+    def observe(self, name: str, seconds: float, label: str = ''):
+        with self._lock:
+            by_label = self.histograms[name]
+            if self.max_labels and label not in by_label and len(by_label) >= self.max_labels:
+                label = 'other'
+            by_label[label].observe(seconds)
+
+    @contextmanager
+    def timer(self, name: str, label: str = ''):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, label)
+
+    def increment(self, name: str, count: int = 1):
+        with self._lock:
+            self.counters[name] += count
+
+    def count_error(self, stage: str, error: BaseException):
+        with self._lock:
+            self.errors[stage][error_category(error)] += 1
+
+    def add_bytes(self, stage: str, count: int):
+        with self._lock:
+            self.bytes[stage] += count
+
+    def report(self) -> Dict:
+        with self._lock:
+            stages = {}
+            for name, entry in self.stages.items():
+                seconds = entry['seconds']
+                stages[name] = {
+                    'seconds': round(seconds, 3),
+                    'items': entry['items'],
+                    'items_per_second': round(entry['items'] / seconds, 3) if seconds else None,
+                }
+            return {
+                'started_at': self.started_at,
+                'wall_seconds': round(time.time() - self.started_at, 3),
+                'stages': stages,
+                'latency': {
+                    name: {label or 'all': histogram.summary() for label, histogram in by_label.items()}
+                    for name, by_label in self.histograms.items()
+                },
+                'counters': dict(self.counters),
+                'errors': {stage: dict(categories) for stage, categories in self.errors.items()},
+                'bytes': dict(self.bytes),
+            }
+
+    def write_report(self, path: str):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=2)
+        os.replace(tmp_path, path)
+
+    def prometheus_text(self) -> str:
+        lines = []
+        with self._lock:
+            lines.append('# TYPE scraper_stage_seconds counter')
+            for name, entry in self.stages.items():
+                lines.append(f"scraper_stage_seconds{label_text(stage=name)} {entry['seconds']:.3f}")
+            lines.append('# TYPE scraper_stage_items counter')
+            for name, entry in self.stages.items():
+                lines.append(f"scraper_stage_items{label_text(stage=name)} {entry['items']}")
+            for name, by_label in self.histograms.items():
+                metric = f"scraper_{name}"
+                lines.append(f'# TYPE {metric} histogram')
+                for label, histogram in by_label.items():
+                    for bound, count in histogram.buckets():
+                        lines.append(f"{metric}_bucket{label_text(label=label, le=bound)} {count}")
+                    lines.append(f"{metric}_bucket{label_text(label=label, le='+Inf')} {histogram.count}")
+                    lines.append(f"{metric}_sum{label_text(label=label)} {histogram.sum:.4f}")
+                    lines.append(f"{metric}_count{label_text(label=label)} {histogram.count}")
+            lines.append('# TYPE scraper_events_total counter')
+            for name, count in self.counters.items():
+                lines.append(f"scraper_events_total{label_text(event=name)} {count}")
+            lines.append('# TYPE scraper_errors_total counter')
+            for stage, categories in self.errors.items():
+                for category, count in categories.items():
+                    lines.append(f"scraper_errors_total{label_text(stage=stage, category=category)} {count}")
+            lines.append('# TYPE scraper_bytes_total counter')
+            for stage, count in self.bytes.items():
+                lines.append(f"scraper_bytes_total{label_text(stage=stage)} {count}")
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, port: int, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+        # Prometheus text format on every path, from a daemon thread for the life of the process
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = metrics.prometheus_text().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+# Shared by every stage of the process
+metrics = RunMetrics()
@@ -0,0 +1,92 @@
+import json
+import os
+from typing import Dict, Iterator
+
+# Append-only JSON-lines file. Every record is flushed as it is written and the file is
+# fsynced every `fsync_every` records, so a crash loses at most the last few lines.
+class JsonlSink:
+    def __init__(self, path: str, fsync_every: int = 20):
+        self.path = path
+        self.fsync_every = fsync_every
+        self._unsynced = 0
+        self._file = open(path, 'a', encoding='utf-8')
+        if self._file.tell() and not self._ends_with_newline():
+            # Terminate a line cut short by a crash so new records start on a fresh line
+            self._file.write('\n')
+
+    def _ends_with_newline(self) -> bool:
+        with open(self.path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b'\n'
+
+    def write(self, record: Dict):
+        self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._file.flush()
+        self._unsynced += 1
+        if self._unsynced >= self.fsync_every:
+            self.sync()
+
+    def sync(self):
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+
+    def close(self):
+        if not self._file.closed:
+            self.sync()
+            self._file.close()
+
+def read_jsonl(path: str) -> Iterator[Dict]:
+    if not os.path.exists(path):
+        return
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # A line cut short by a crash; everything before it is intact
+                continue
+
+# The per-stage sinks of one run. Each line carries the key it completes (place URL, website,
+# Facebook link, rendered website), so the sinks double as the checkpoint that --resume reads back.
+class RunCheckpoint:
+    STAGES = ('places', 'websites', 'facebook', 'rendered')
+
+    def __init__(self, run_dir: str, resume: bool = False, fsync_every: int = 20):
+        self.run_dir = run_dir
+        os.makedirs(run_dir, exist_ok=True)
+        if not resume:
+            for stage in self.STAGES:
+                if os.path.exists(self.path(stage)):
+                    os.remove(self.path(stage))
+        self.sinks = {stage: JsonlSink(self.path(stage), fsync_every) for stage in self.STAGES}
+
+    def path(self, stage: str) -> str:
+        return os.path.join(self.run_dir, f"{stage}.jsonl")
+
+    def completed_places(self) -> Dict[str, Dict]:
+        return {line['place_url']: line['record'] for line in read_jsonl(self.path('places'))}
+
+    def record_place(self, place_url: str, record: Dict):
+        self.sinks['places'].write({'place_url': place_url, 'record': record})
+
+    def website_results(self) -> Iterator[Dict]:
+        return read_jsonl(self.path('websites'))
+
+    def record_website(self, website: str, data: Dict):
+        self.sinks['websites'].write({'website': website, 'data': data})
+
+    def facebook_emails(self) -> Dict[str, str]:
+        return {line['link']: line['email'] for line in read_jsonl(self.path('facebook'))}
+
+    def record_facebook(self, link: str, email: str):
+        self.sinks['facebook'].write({'link': link, 'email': email})
+
+    def rendered_emails(self) -> Dict[str, str]:
+        return {line['website']: line['email'] for line in read_jsonl(self.path('rendered'))}
+
+    def record_rendered(self, website: str, email: str):
+        self.sinks['rendered'].write({'website': website, 'email': email})
+
+    def close(self):
+        for sink in self.sinks.values():
+            sink.close()
@@ -0,0 +1,324 @@
+import argparse
+import asyncio
+import json
+import time
+from typing import Dict, Optional
+
+from aiohttp import web
+from playwright.async_api import async_playwright
+
+from async_browser import close_quietly
+from browser_profile import ResourceBlocker, launch_browser, load_block_config
+from place_details import place_failed, scrape_place
+from place_store import place_key
+from results_feed import open_maps_async, scroll_feed_async, search_maps_async
+from run_metrics import metrics
+from website_extractor import AsyncWebsiteDataExtractor
+
+VIEWPORT = {'viewport': {"width": 1920, "height": 1080}}
+DETAIL_TIMEOUT = 45
+
+# Checks and converts a search job's fields before it may take a context, so a malformed job is
+# answered with a 400 instead of failing while it holds a warm page
+def parse_job(job, default_workers: int) -> Dict:
+    if not isinstance(job, dict) or not isinstance(job.get('query'), str) or not job['query'].strip():
+        raise ValueError('A "query" is required')
+    parsed = {'query': job['query']}
+    for name, default in (('total', 20), ('workers', default_workers)):
+        try:
+            value = int(job.get(name, default))
+        except (TypeError, ValueError):
+            raise ValueError(f'"{name}" must be a positive integer')
+        if isinstance(job.get(name), bool) or value < 1:
+            raise ValueError(f'"{name}" must be a positive integer')
+        parsed[name] = value
+    for name, default in (('details', True), ('websites', False)):
+        value = job.get(name, default)
+        if not isinstance(value, bool):
+            raise ValueError(f'"{name}" must be true or false')
+        parsed[name] = value
+    return parsed
+
+# One warm browser context with a page already showing Maps and its search box, plus the pages
+# that open its jobs' places, or a cold one (no context) left by a failed reset, which the next
+# job to take it rebuilds
+class WarmSlot:
+    def __init__(self, context=None, page=None):
+        self.context = context
+        self.page = page
+        self.detail_pages = []
+        self.jobs = 0
+
+# Keeps one browser and `contexts` warm Maps pages for the life of the process. A search job
+# takes a free page, types its query into the already-loaded search box and streams every place
+# back as it is scraped by the detail pages kept open in the same context; the page is then reset
+# to Maps, or the context replaced by a fresh one after `recycle_after` jobs so a long-lived
+# context cannot grow without bound.
+class ScrapeService:
+    def __init__(self, contexts: int = 2, recycle_after: int = 20, detail_workers: int = 2, concurrency: int = 20,
+                 per_host: int = 2, fast: bool = False, block_config: Optional[str] = None):
+        self.contexts = contexts
+        self.recycle_after = recycle_after
+        self.detail_workers = detail_workers
+        self.fast = fast
+        self.blocker = ResourceBlocker(load_block_config(block_config)) if fast else None
+        self.extractor = AsyncWebsiteDataExtractor(concurrency=concurrency, per_host=per_host)
+        self.jobs_done = 0
+        self.waiting = 0
+        self._playwright = None
+        self._browser = None
+        self._session = None
+        self._slots = None
+        self._releases = set()
+
+    async def start(self):
+        # The process serves jobs indefinitely, so latency samples and per-host labels are bounded
+        metrics.bound()
+        self._playwright = await async_playwright().start()
+        self._browser = await launch_browser(self._playwright, self.fast)
+        self._session = self.extractor.open_session()
+        self._slots = asyncio.Queue()
+        for slot in await asyncio.gather(*(self._open_slot() for _ in range(self.contexts))):
+            self._slots.put_nowait(slot)
+        print(f"{self.contexts} warm Maps contexts ready")
+
+    async def stop(self):
+        while self._slots and not self._slots.empty():
+            slot = self._slots.get_nowait()
+            if slot.context is not None:
+                await close_quietly(slot.context)
+        if self._session:
+            await self._session.close()
+        if self._browser:
+            await self._browser.close()
+        if self._playwright:
+            await self._playwright.stop()
+
+    async def _setup_page(self, page):
+        if self.blocker:
+            await self.blocker.install_async(page)
+
+    async def _open_slot(self) -> WarmSlot:
+        context = await self._browser.new_context(**VIEWPORT)
+        try:
+            page = await context.new_page()
+            await self._setup_page(page)
+            slot = WarmSlot(context, page)
+            slot.detail_pages = [await self._open_detail_page(slot) for _ in range(self.detail_workers)]
+            await self._warm(slot)
+        except BaseException:
+            await close_quietly(context)
+            raise
+        return slot
+
+    async def _open_detail_page(self, slot: WarmSlot):
+        page = await slot.context.new_page()
+        await self._setup_page(page)
+        return page
+
+    async def _warm(self, slot: WarmSlot):
+        # Pages a larger job opened beyond the default are closed; the rest stay for the next job
+        while len(slot.detail_pages) > self.detail_workers:
+            await close_quietly(slot.detail_pages.pop())
+        await open_maps_async(slot.page)
+
+    async def _release(self, slot: WarmSlot, healthy: bool):
+        # Runs after the response is finished, so resetting never delays a client
+        slot.jobs += 1
+        try:
+            if healthy and slot.jobs < self.recycle_after:
+                await self._warm(slot)
+            else:
+                await close_quietly(slot.context)
+                slot = await self._open_slot()
+        except Exception as e:
+            print(f"Error rewarming a Maps context: {str(e) or type(e).__name__}")
+            metrics.count_error('service', e)
+            if slot.context is not None:
+                await close_quietly(slot.context)
+            # Put back cold rather than retried here, so a slot is never lost while Maps is unreachable
+            slot = WarmSlot()
+        self._slots.put_nowait(slot)
+
+    async def _take_slot(self) -> WarmSlot:
+        slot = await self._slots.get()
+        if slot.context is None:
+            try:
+                slot = await self._open_slot()
+            except BaseException:
+                self._slots.put_nowait(slot)
+                raise
+        return slot
+
+    async def _website_line(self, website: str, place_url: str) -> Dict:
+        data = await self.extractor.extract_structured_data_async(website, self._session)
+        return {'type': 'website', 'place_url': place_url, 'website': website, 'data': {
+            'contact_info': data['contact_info'],
+            'social_media': data['social_media'],
+            'business_hours': data['business_hours'],
+        }}
+
+    # Works through `places` on the slot's index-th detail page. The page shares the warm context
+    # of the search, and one that fails or hangs is swapped for a new page in that same context.
+    async def _detail_worker(self, slot: WarmSlot, index: int, places: asyncio.Queue, on_result):
+        while True:
+            href = await places.get()
+            if href is None:
+                return
+            try:
+                record = await asyncio.wait_for(scrape_place(slot.detail_pages[index], href), DETAIL_TIMEOUT)
+            except Exception as e:
+                place_failed(href, e)
+                record = None
+                await close_quietly(slot.detail_pages[index])
+                slot.detail_pages[index] = await self._open_detail_page(slot)
+            await on_result(href, record)
+
+    async def run_job(self, job: Dict, emit):
+        # `emit(line)` is awaited with every NDJSON line of the job, in completion order
+        job = parse_job(job, self.detail_workers)
+        total, workers, details, websites = job['total'], job['workers'], job['details'], job['websites']
+        places = asyncio.Queue()
+        seen = set()
+        website_tasks = []
+        counts = {'places': 0, 'failed': 0}
+        healthy = False
+
+        async def forward(hrefs):
+            for href in hrefs:
+                key = place_key(href)
+                if key in seen:
+                    continue
+                seen.add(key)
+                if details:
+                    await places.put(href)
+                else:
+                    counts['places'] += 1
+                    await emit({'type': 'place', 'place_url': href})
+
+        async def discover():
+            try:
+                await search_maps_async(slot.page, job['query'])
+                await scroll_feed_async(slot.page, total, on_links=forward)
+            finally:
+                for _ in range(workers):
+                    places.put_nowait(None)
+
+        async def place_done(href, record):
+            if record is None:
+                counts['failed'] += 1
+                return
+            counts['places'] += 1
+            await emit({'type': 'place', 'place_url': href, 'record': record})
+            if websites and record['Website']:
+                website_tasks.append(asyncio.ensure_future(self._website_line(record['Website'], href)))
+
+        tasks = []
+        started = time.perf_counter()
+        self.waiting += 1
+        try:
+            slot = await self._take_slot()
+        finally:
+            self.waiting -= 1
+        try:
+            queued = time.perf_counter() - started
+            metrics.observe('service_queue_seconds', queued)
+            while details and len(slot.detail_pages) < workers:
+                slot.detail_pages.append(await self._open_detail_page(slot))
+            with metrics.timer('service_job_seconds'):
+                tasks = [asyncio.ensure_future(stage) for stage in (discover(), *(
+                    self._detail_worker(slot, index, places, place_done)
+                    for index in range(workers if details else 0)
+                ))]
+                await asyncio.gather(*tasks)
+                for task in asyncio.as_completed(website_tasks):
+                    await emit(await task)
+            healthy = True
+            await emit({'type': 'done', 'places': counts['places'], 'failed': counts['failed'],
+                        'queued_ms': round(queued * 1000, 1), 'seconds': round(time.perf_counter() - started, 3)})
+        finally:
+            # A failed emit (the client went away) must also stop discovery, and the page may only
+            # be reset once nothing is scrolling it any more
+            for task in tasks + website_tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.jobs_done += 1
+            metrics.add_items('service_jobs')
+            release = asyncio.ensure_future(self._release(slot, healthy))
+            self._releases.add(release)
+            release.add_done_callback(self._releases.discard)
+
+    def status(self) -> Dict:
+        return {'contexts': self.contexts, 'idle': self._slots.qsize(), 'waiting': self.waiting, 'jobs_done': self.jobs_done}
+
+async def handle_search(request: web.Request) -> web.StreamResponse:
+    service = request.app['service']
+    try:
+        job = await request.json()
+    except ValueError:
+        raise web.HTTPBadRequest(text='Body must be a JSON object')
+    try:
+        job = parse_job(job, service.detail_workers)
+    except ValueError as e:
+        raise web.HTTPBadRequest(text=str(e))
+    response = web.StreamResponse(headers={'Content-Type': 'application/x-ndjson'})
+    await response.prepare(request)
+
+    async def emit(line):
+        await response.write((json.dumps(line, ensure_ascii=False) + '\n').encode('utf-8'))
+
+    try:
+        await service.run_job(job, emit)
+    except ConnectionResetError:
+        # The client went away mid-stream; run_job already marked its context for replacement
+        return response
+    except Exception as e:
+        print(f"Error running search {job.get('query')!r}: {str(e) or type(e).__name__}")
+        metrics.count_error('service', e)
+        await emit({'type': 'error', 'error': str(e) or type(e).__name__})
+    await response.write_eof()
+    return response
+
+async def handle_status(request: web.Request) -> web.Response:
+    return web.json_response(request.app['service'].status())
+
+async def handle_metrics(request: web.Request) -> web.Response:
+    return web.Response(text=metrics.prometheus_text(), content_type='text/plain')
+
+def build_app(service: ScrapeService) -> web.Application:
+    app = web.Application()
+    app['service'] = service
+    app.router.add_post('/search', handle_search)
+    app.router.add_get('/status', handle_status)
+    app.router.add_get('/metrics', handle_metrics)
+
+    async def start(app):
+        await service.start()
+
+    async def stop(app):
+        await service.stop()
+
+    app.on_startup.append(start)
+    app.on_cleanup.append(stop)
+    return app
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve Maps searches from warm browser contexts over a local HTTP or Unix-socket API")
+    parser.add_argument("--host", type=str, default='127.0.0.1')
+    parser.add_argument("--port", type=int, default=8790)
+    parser.add_argument("--socket", type=str, help="Listen on this Unix socket path instead of a TCP port")
+    parser.add_argument("--contexts", type=int, default=2, help="Warm Maps contexts, i.e. searches served at once")
+    parser.add_argument("--recycle-after", type=int, default=20, help="Jobs after which a context is replaced by a fresh one")
+    parser.add_argument("--detail-workers", type=int, default=2, help="Default place detail pages per job (a job's \"workers\" overrides it)")
+    parser.add_argument("--concurrency", type=int, default=20, help="Maximum in-flight website requests across jobs")
+    parser.add_argument("--per-host", type=int, default=2, help="Maximum in-flight website requests per host")
+    parser.add_argument("--fast", action="store_true", help="Run headless and block images, media, fonts, map tiles and trackers")
+    parser.add_argument("--block-config", type=str, help="JSON file overriding the resource_types, url_patterns or domains blocked by --fast")
+    args = parser.parse_args()
+
+    service = ScrapeService(args.contexts, args.recycle_after, args.detail_workers, args.concurrency, args.per_host,
+                            args.fast, args.block_config)
+    if args.socket:
+        web.run_app(build_app(service), path=args.socket)
+    else:
+        web.run_app(build_app(service), host=args.host, port=args.port)
@@ -0,0 +1,66 @@
+import asyncio
+from unittest import mock
+
+import pytest
+
+pytest.importorskip('pandas')
+pytest.importorskip('playwright')
+
+import geo_tiling
+import main
+from place_details import null_record
+
+LINKS = [f"https://www.google.com/maps/place/Place+{n}/data=!4m7!3m6!1s0x{n}:0x{n}" for n in range(1, 4)]
+
+def place(n):
+    return dict(null_record(), Names=f"Place {n}", Website=f"place{n}.com")
+
+def test_tiled_places_are_scraped_by_url_with_a_single_worker():
+    # A tiled discovery leaves no feed to click (listings is None), even with --detail-workers 1
+    checkpoint = mock.Mock()
+    scraped_data = [None] * len(LINKS)
+
+    def scrape(hrefs, workers, fast, on_result, blocker):
+        assert workers == 1
+        for position, href in enumerate(hrefs):
+            on_result(position, href, place(position + 1))
+
+    with mock.patch.object(main, 'scrape_place_details', side_effect=scrape) as scrape_place_details:
+        main.scrape_pending_places(None, None, LINKS, [0, 1, 2], scraped_data, 1, checkpoint, False, None)
+
+    scrape_place_details.assert_called_once()
+    assert [record['Names'] for record in scraped_data] == ['Place 1', 'Place 2', 'Place 3']
+    assert checkpoint.record_place.call_count == 3
+
+class FakeContext:
+    async def new_page(self):
+        return mock.Mock()
+
+    async def close(self):
+        pass
+
+class FakeBrowser:
+    async def new_context(self, **options):
+        return FakeContext()
+
+    async def close(self):
+        pass
+
+def test_tiling_stops_searching_cells_once_total_is_reached():
+    cells = [geo_tiling.BoundingBox(0, n, 1, n + 1) for n in range(6)]
+    searched = []
+
+    async def search_cell(page, task):
+        searched.append(task[1])
+        return [LINKS[len(searched) - 1]], True
+
+    async def launch(p, fast):
+        return FakeBrowser()
+
+    with mock.patch.object(geo_tiling, '_search_cell', side_effect=search_cell), \
+            mock.patch.object(geo_tiling, 'launch_browser', side_effect=launch), \
+            mock.patch.object(geo_tiling, 'async_playwright', return_value=mock.AsyncMock()):
+        links = asyncio.run(geo_tiling._tile_async('salon', cells, 2, 1, 30, False, 3, 100, None))
+
+    assert len(links) == 2
+    assert searched == cells[:2]
@@ -1,132 +1,173 @@
 from playwright.sync_api import sync_playwright
 import pandas as pd
 import argparse
-import re
-import requests
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin
-import json
-from typing import Dict, List, Optional
-import time
-from tqdm import tqdm
-
-def scrape_treatwell(search_query, location, date):
+from typing import Callable, Dict, List, Optional
+import os
+from browser_profile import ResourceBlocker, launch_browser, load_block_config
+from playwright.async_api import async_playwright
+from async_browser import map_pages, run_async
+from run_state import JsonlSink, read_jsonl
+from run_metrics import metrics
+from rate_limiter import limiter
+
+VENUE_SELECTORS = {
+    'hero': '.VenueHero-module--container--3t62T',
+    'photo': '.Carousel-module--image--247744',
+    'description': '.VenueDescription-module--content--2m13n',
+    'staff_list': '.StaffList-module--staffList--3y6bS',
+    'staff_member': '.StaffMemberCard-module--container--2qXh6',
+    'hours': '.OpeningHours-module--openingHours--11w7u',
+    'review_list': '.ReviewList-module--reviewList--1M4yI',
+    'review': '.ReviewCard-module--container--120yJ',
+    'review_rating': '.ReviewCard-module--rating--2nE0F',
+    'service_list': '.TreatmentList-module--treatmentList--318yJ',
+    'service': '.TreatmentCard-module--treatmentCard--108pE',
+}
+MAX_REVIEWS = 5
+DEFAULT_JSONL_PATH = 'treatwell_data.jsonl'
+TREATWELL_URL = "https://www.treatwell.co.uk/"
+
+# Every venue of a run is on this host, so failures there slow it down instead of pausing it
+limiter.keep_open(TREATWELL_URL)
+
+# Reads every section of a venue page in one round-trip; a section that is not on the page is null
+VENUE_EXTRACTION_JS = """
+(s) => {
+    const first = (selector) => document.querySelector(selector);
+    const texts = (selector) => Array.from(document.querySelectorAll(selector), node => node.innerText);
+    const photo = first(s.photo);
+    return {
+        photo: photo ? photo.getAttribute('src') : null,
+        description: first(s.description) ? first(s.description).innerText : null,
+        team: first(s.staff_list) ? texts(s.staff_member) : null,
+        hours: first(s.hours) ? first(s.hours).innerText : null,
+        reviews: first(s.review_list) ? Array.from(document.querySelectorAll(s.review), review => {
+            const rating = review.querySelector(s.review_rating);
+            return {rating: rating ? rating.innerText : '', text: review.innerText};
+        }) : null,
+        services: first(s.service_list) ? texts(s.service) : null,
+    };
+}
+"""
+
+def parse_venue_record(record: Dict) -> Dict:
+    data = {
+        'salon_photo': record.get('photo') or 'N/A',
+        'salon_description': record['description'] if record.get('description') is not None else 'N/A',
+        'team': record['team'] if record.get('team') is not None else 'N/A',
+        'opening_hours': record['hours'] if record.get('hours') is not None else 'N/A',
+    }
+    if record.get('reviews') is not None:
+        good_reviews = []
+        bad_reviews = []
+        for review in record['reviews']:
+            if "5" in review['rating'] and len(good_reviews) < MAX_REVIEWS:
+                good_reviews.append(review['text'])
+            elif "1" in review['rating'] and len(bad_reviews) < MAX_REVIEWS:
+                bad_reviews.append(review['text'])
+        data['good_reviews'] = good_reviews
+        data['bad_reviews'] = bad_reviews
+    else:
+        data['good_reviews'] = 'N/A'
+        data['bad_reviews'] = 'N/A'
+    # The stylist cards are the team list, read once
+    data['booking_situation'] = data['team']
+    data['services'] = record['services'] if record.get('services') is not None else 'N/A'
+    return data
+
+async def _scrape_venue(page, url: str) -> Dict:
+    with metrics.timer('venue_seconds'):
+        await limiter.goto_async(page, url, timeout=60000, wait_until='domcontentloaded')
+        await page.wait_for_selector(VENUE_SELECTORS['hero'])
+        try:
+            # The treatment list renders last; venues without one simply time out here
+            await page.wait_for_selector(VENUE_SELECTORS['service_list'], timeout=3000)
+        except Exception:
+            pass
+        return parse_venue_record(await page.evaluate(VENUE_EXTRACTION_JS, VENUE_SELECTORS))
+
+def _failed_venue(url: str, error: Exception) -> Optional[Dict]:
+    print(f"Error scraping salon {url}: {str(error) or type(error).__name__}")
+    metrics.count_error('venues', error)
+    return None
+
+async def _scrape_venues_async(urls: List[str], workers: int, timeout: float, fast: bool,
+                               blocker: Optional[ResourceBlocker], on_result) -> List[Optional[Dict]]:
+    async with async_playwright() as p:
+        browser = await launch_browser(p, fast)
+        try:
+            return await map_pages(
+                browser, urls, _scrape_venue, workers, timeout, _failed_venue,
+                setup_page=blocker.install_async if blocker else None,
+                desc="Scraping salons", on_result=on_result
+            )
+        finally:
+            await browser.close()
+
+# Venue pages over a pool of `workers` pages in one browser. Returns one record per URL, None
+# for venues that failed to load; `on_result(url, record)` sees each success as it completes.
+def scrape_venues(urls: List[str], workers: int = 4, timeout: float = 60, fast: bool = False,
+                  blocker: Optional[ResourceBlocker] = None,
+                  on_result: Optional[Callable[[str, Dict], None]] = None) -> List[Optional[Dict]]:
+    def store(index, url, record):
+        if record is not None and on_result:
+            on_result(url, record)
+
+    return run_async(_scrape_venues_async(urls, workers, timeout, fast, blocker, store)) if urls else []
+
+def scrape_treatwell(search_query, location, date, fast=False, block_config=None, workers=4,
+                     output_csv='treatwell_data.csv', output_jsonl=DEFAULT_JSONL_PATH, resume=False, report_path=None):
+    metrics.reset()
     with sync_playwright() as p:
-        browser = p.chromium.launch(headless=False)
+        browser = launch_browser(p, fast)
         page = browser.new_page()
-        page.goto("https://www.treatwell.co.uk/")
-
-        # Fill search query and location
-        page.fill('input[name="service"]', search_query)
-        page.fill('input[name="place"]', location)
-
-        # Select date
-        page.click('input[name="date"]')
-        page.fill('input[name="date"]', date)
-        page.click('text=Find treatments')
-
-        page.wait_for_selector('.VenueCard-module--content--2u0f6')
-
-        salon_links = page.locator('.VenueCard-module--content--2u0f6 a').all()
-        salon_urls = [salon.get_attribute('href') for salon in salon_links]
-
-        salon_data = []
-        for url in tqdm(salon_urls, desc="Scraping salons"):
-            print(f"Scraping salon: {url}") #debug print
-            page.goto(url)
-            page.wait_for_selector('.VenueHero-module--container--3t62T')
-            page.wait_for_timeout(2000) #increase wait time
-
-            data = {}
-
-            # Salon Photo
-            salon_photo_selector = '.Carousel-module--image--247744'
-            if page.locator(salon_photo_selector).count() > 0:
-                data['salon_photo'] = page.locator(salon_photo_selector).first.get_attribute('src')
-                print(f"Salon Photo: {data['salon_photo']}") #debug print
-            else:
-                data['salon_photo'] = 'N/A'
-                print("Salon Photo: N/A") #debug print
-
-            # Salon Description
-            description_selector = '.VenueDescription-module--content--2m13n'
-            if page.locator(description_selector).count() > 0:
-                data['salon_description'] = page.locator(description_selector).inner_text()
-                print(f"Salon Description: {data['salon_description'][:50]}...") #debug print
-            else:
-                data['salon_description'] = 'N/A'
-                print("Salon Description: N/A") #debug print
-
-            # Team
-            team_selector = '.StaffList-module--staffList--3y6bS'
-            if page.locator(team_selector).count() > 0:
-                team_members = page.locator('.StaffMemberCard-module--container--2qXh6').all()
-                data['team'] = [member.inner_text() for member in team_members]
-                print(f"Team: {len(data['team'])} members") #debug print
-            else:
-                data['team'] = 'N/A'
-                print("Team: N/A") #debug print
-
-            # Opening Hours
-            hours_selector = '.OpeningHours-module--openingHours--11w7u'
-            if page.locator(hours_selector).count() > 0:
-                data['opening_hours'] = page.locator(hours_selector).inner_text()
-                print(f"Opening Hours: {data['opening_hours'][:50]}...") #debug print
-            else:
-                data['opening_hours'] = 'N/A'
-                print("Opening Hours: N/A") #debug print
-
-            # Reviews
-            reviews_selector = '.ReviewList-module--reviewList--1M4yI'
-            if page.locator(reviews_selector).count() > 0:
-                reviews = page.locator('.ReviewCard-module--container--120yJ').all()
-                good_reviews = []
-                bad_reviews = []
-                good_count = 0
-                bad_count = 0
-                for review in reviews:
-                    rating_text = review.locator(".ReviewCard-module--rating--2nE0F").inner_text()
-                    if "5" in rating_text and good_count < 5:
-                        good_reviews.append(review.inner_text())
-                        good_count += 1
-                    elif "1" in rating_text and bad_count < 5:
-                        bad_reviews.append(review.inner_text())
-                        bad_count += 1
-                data['good_reviews'] = good_reviews
-                data['bad_reviews'] = bad_reviews
-                print(f"Good Reviews: {len(good_reviews)}, Bad Reviews: {len(bad_reviews)}") #debug print
-            else:
-                data['good_reviews'] = 'N/A'
-                data['bad_reviews'] = 'N/A'
-                print("Reviews: N/A") #debug print
-
-            # Booking Situation
-            booking_selector = '.StaffList-module--staffList--3y6bS'
-            if page.locator(booking_selector).count() > 0:
-                stylists = page.locator('.StaffMemberCard-module--container--2qXh6').all()
-                booking_situation = []
-                for stylist in stylists:
-                    booking_situation.append(stylist.inner_text())
-                data['booking_situation'] = booking_situation
-                print(f"Booking Situation: {len(booking_situation)} stylists") #debug print
-            else:
-                data['booking_situation'] = 'N/A'
-                print("Booking Situation: N/A") #debug print
-
-            #services
-            services_selector = '.TreatmentList-module--treatmentList--318yJ'
-            if page.locator(services_selector).count() > 0:
-                services = page.locator('.TreatmentCard-module--treatmentCard--108pE').all()
-                data['services'] = [service.inner_text() for service in services]
-                print(f"Services: {len(data['services'])} services") #debug print
-            else:
-                data['services'] = 'N/A'
-                print("Services: N/A") #debug print
-
-            salon_data.append(data)
-
-        df = pd.DataFrame(salon_data)
-        df.to_csv('treatwell_data.csv', index=False)
+        blocker = ResourceBlocker(load_block_config(block_config)) if fast else None
+        if blocker:
+            blocker.install(page)
+        with metrics.stage('discovery'):
+            limiter.goto(page, TREATWELL_URL)
+
+            # Fill search query and location
+            page.fill('input[name="service"]', search_query)
+            page.fill('input[name="place"]', location)
+
+            # Select date
+            page.click('input[name="date"]')
+            page.fill('input[name="date"]', date)
+            limiter.call(page.url, lambda: page.click('text=Find treatments'), retries=0)
+
+            page.wait_for_selector('.VenueCard-module--content--2u0f6')
+
+            salon_links = page.locator('.VenueCard-module--content--2u0f6 a').all()
+            salon_urls = list(dict.fromkeys(urljoin(page.url, salon.get_attribute('href')) for salon in salon_links))
+        metrics.add_items('discovery', len(salon_urls))
+
+        # Venues are appended to the JSONL file as they finish; --resume skips those already in it
+        if not resume and os.path.exists(output_jsonl):
+            os.remove(output_jsonl)
+        completed = {line['url']: line['record'] for line in read_jsonl(output_jsonl)}
+        if completed:
+            print(f"Resuming: {len(completed)} salons already scraped")
+        sink = JsonlSink(output_jsonl)
+        pending = [url for url in salon_urls if url not in completed]
+
+        def store_venue(url, record):
+            completed[url] = record
+            sink.write({'url': url, 'record': record})
+
+        with metrics.stage('venues', items=len(pending)):
+            scrape_venues(pending, workers=workers, fast=fast, blocker=blocker, on_result=store_venue)
+        sink.close()
+
+        df = pd.DataFrame([completed[url] for url in salon_urls if url in completed])
+        df.to_csv(output_csv + '.tmp', index=False)
+        os.replace(output_csv + '.tmp', output_csv)
+        if blocker:
+            print(blocker.report())
+            metrics.add_bytes('browser', blocker.loaded_bytes)
+        metrics.write_report(report_path or os.path.splitext(output_csv)[0] + '_report.json')
+        print(f"Scraped {len(df)} of {len(salon_urls)} salons")
         print(df.head())
         browser.close()
 
@@ -135,5 +176,12 @@ if __name__ == "__main__":
     parser.add_argument("-s", "--search", type=str, required=True)
     parser.add_argument("-l", "--location", type=str, required=True)
     parser.add_argument("-d", "--date", type=str, required=True)
+    parser.add_argument("--fast", action="store_true", help="Run headless and block images, media, fonts and trackers")
+    parser.add_argument("--block-config", type=str, help="JSON file overriding the resource_types, url_patterns or domains blocked by --fast")
+    parser.add_argument("-w", "--workers", type=int, default=4, help="Salon pages scraped concurrently")
+    parser.add_argument("--jsonl", type=str, default=DEFAULT_JSONL_PATH, help="File each salon is appended to as soon as it is scraped")
+    parser.add_argument("--resume", action="store_true", help="Skip salons already in the --jsonl file")
+    parser.add_argument("--report", type=str, help="Path of the JSON run report with stage timings, venue latencies and errors (default: treatwell_data_report.json)")
     args = parser.parse_args()
-    scrape_treatwell(args.search, args.location, args.date)
\ No newline at end of file
+    scrape_treatwell(args.search, args.location, args.date, fast=args.fast, block_config=args.block_config,
+                     workers=args.workers, output_jsonl=args.jsonl, resume=args.resume, report_path=args.report)
\ No newline at end of file
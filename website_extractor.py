@@ -0,0 +1,324 @@
+import asyncio
+import re
+import requests
+import aiohttp
+from bs4 import BeautifulSoup
+from urllib.parse import urljoin, urlparse
+import json
+from typing import Callable, Dict, List, Optional
+import time
+import weakref
+from tqdm import tqdm
+from http_cache import HttpCache
+from async_browser import run_async
+import html_extraction
+from html_extraction import ParsedPage, looks_js_rendered, parse_page, visible_text
+from run_metrics import metrics
+from contact_scanner import ContactScan, scan, scan_contact_links, social_platform
+from rate_limiter import limiter
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+}
+
+class WebsiteDataExtractor:
+    def __init__(self, cache: Optional[HttpCache] = None, single_pass: bool = True):
+        self.contact_link_pattern = re.compile(r'contact|about|get-in-touch|reach-us', re.I)
+        # The lxml single-pass parser is used when installed; BeautifulSoup remains the fallback
+        self.single_pass = single_pass and html_extraction.is_available()
+        self._session = None
+        self.cache = cache
+
+    def extract_structured_data(self, url: str) -> Dict:
+        if not url or url == "N/A":
+            return self._get_empty_result()
+        try:
+            session = self._get_session()
+            html = self._get_page_html(url, session)
+            document = self._parse_document(html)
+            contact_pages = []
+            for contact_url in self._find_contact_links(document, url):
+                try:
+                    contact_pages.append(self._fetch_html(contact_url, session, 10))
+                except Exception as e:
+                    metrics.count_error('contact_pages', e)
+            result = self._assemble_result(url, document, contact_pages)
+            # Tells the tiered mode in main.py which sites need a rendered fetch
+            result['js_rendered'] = looks_js_rendered(html)
+            return result
+        except Exception as e:
+            print(f"Error extracting data from {url}: {str(e)}")
+            metrics.count_error('websites', e)
+            return self._get_empty_result()
+
+    def _parse_document(self, html: str):
+        if self.single_pass:
+            return parse_page(html)
+        return BeautifulSoup(html, 'html.parser')
+
+    def _assemble_result(self, url: str, document, contact_pages: List[str]) -> Dict:
+        if isinstance(document, ParsedPage):
+            return self._assemble_parsed_page(url, document, contact_pages)
+        hrefs = [link['href'] for link in document.find_all('a', href=True)]
+        found = scan_contact_links(hrefs, scan(document.get_text()))
+        for html in contact_pages:
+            try:
+                scan(BeautifulSoup(html, 'html.parser').get_text(), found)
+            except Exception as e:
+                metrics.count_error('contact_pages', e)
+        return {
+            'url': url,
+            'structured_data': self._extract_schema_data(document),
+            'meta_data': self._extract_meta_data(document),
+            'contact_info': self._contact_info(found),
+            'social_media': self._social_links(hrefs),
+            'business_hours': self._extract_business_hours(document),
+            'additional_info': self._extract_additional_info(document)
+        }
+
+    def _assemble_parsed_page(self, url: str, page: ParsedPage, contact_pages: List[str]) -> Dict:
+        found = scan_contact_links(page.anchors, scan(page.text))
+        for html in contact_pages:
+            # One unparsable contact page only loses that page, not what the homepage already gave
+            try:
+                scan(visible_text(html), found)
+            except Exception as e:
+                metrics.count_error('contact_pages', e)
+        social_media = self._social_links(page.anchors)
+        if 'openingHours' in page.schema_data:
+            business_hours = page.schema_data['openingHours']
+        elif page.hours_text is not None:
+            business_hours = {'raw': page.hours_text}
+        else:
+            business_hours = {}
+        additional_info = {}
+        if page.price_range is not None:
+            additional_info['price_range'] = page.price_range
+        if page.cuisine is not None:
+            additional_info['cuisine'] = page.cuisine
+        return {
+            'url': url,
+            'structured_data': page.schema_data,
+            'meta_data': page.meta_data,
+            'contact_info': self._contact_info(found),
+            'social_media': social_media,
+            'business_hours': business_hours,
+            'additional_info': additional_info
+        }
+
+    def _get_session(self):
+        # One session per extractor so connections and TLS handshakes are reused across sites
+        if self._session is None:
+            self._session = self._create_session()
+        return self._session
+
+    def _create_session(self):
+        session = requests.Session()
+        session.verify = False
+        session.headers.update(DEFAULT_HEADERS)
+        return session
+
+    def _normalize_url(self, url: str) -> str:
+        if not url.startswith(('http://', 'https://')):
+            url = 'https://' + url
+        return url
+
+    def _get_page_html(self, url: str, session) -> str:
+        return self._fetch_html(self._normalize_url(url), session, 20, retries=2)
+
+    def _fetch_html(self, url: str, session, timeout: int, retries: int = 0) -> str:
+        entry, headers = None, {}
+        if self.cache is not None:
+            body, entry, headers = self.cache.lookup(url)
+            if body is not None:
+                metrics.increment('website_cache_hits')
+                return body
+
+        def send():
+            started = time.perf_counter()
+            response = session.get(url, timeout=timeout, headers=headers)
+            metrics.observe('website_fetch_seconds', time.perf_counter() - started, urlparse(url).hostname or '')
+            return response
+
+        # The host's token bucket paces the request, and errors or 429/5xx answers are retried with backoff
+        response = limiter.call(url, send, lambda response: (response.status_code, response.headers), retries, 'website_retries')
+        metrics.add_bytes('websites', len(response.content))
+        if response.status_code == 304 and entry:
+            metrics.increment('website_revalidated')
+            self.cache.revalidated(url, entry, response.headers)
+            return entry['body']
+        if self.cache is not None:
+            self.cache.store(url, response.status_code, response.headers, response.text)
+        return response.text
+
+    def _extract_schema_data(self, soup: BeautifulSoup) -> Dict:
+        schema_data = {}
+        scripts = soup.find_all('script', type='application/ld+json')
+        for script in scripts:
+            try:
+                data = json.loads(script.string)
+                if isinstance(data, dict):
+                    schema_data.update(data)
+                elif isinstance(data, list):
+                    for item in data:
+                        if isinstance(item, dict):
+                            schema_data.update(item)
+            except:
+                continue
+        return schema_data
+
+    def _extract_meta_data(self, soup: BeautifulSoup) -> Dict:
+        meta_data = {}
+        for meta in soup.find_all('meta'):
+            name = meta.get('name', meta.get('property', ''))
+            content = meta.get('content', '')
+            if name and content:
+                meta_data[name] = content
+        return meta_data
+
+    def _find_contact_links(self, document, url: str) -> List[str]:
+        if isinstance(document, ParsedPage):
+            hrefs = [href for href in document.anchors if self.contact_link_pattern.search(href)]
+        else:
+            hrefs = [link['href'] for link in document.find_all('a', href=self.contact_link_pattern)]
+        return [urljoin(url, href) for href in hrefs[:2]]
+
+    def _contact_info(self, found: ContactScan) -> Dict:
+        return {'emails': list(found.emails), 'phones': list(found.phones), 'address': None}
+
+    def _social_links(self, hrefs: List[str]) -> Dict:
+        # Link targets by platform, each classified with one search of the shared pattern
+        social_media = {}
+        for href in hrefs:
+            platform = social_platform(href)
+            if platform:
+                social_media.setdefault(platform, {})[href] = None
+        return {platform: list(links) for platform, links in social_media.items()}
+
+    def _extract_business_hours(self, soup: BeautifulSoup) -> Optional[Dict]:
+        schema_data = self._extract_schema_data(soup)
+        if 'openingHours' in schema_data:
+            return schema_data['openingHours']
+        hours_div = soup.find('div', class_=re.compile(r'hours|schedule|timing', re.I))
+        if hours_div:
+            return {'raw': hours_div.get_text(strip=True)}
+        return {}
+
+    def _extract_additional_info(self, soup: BeautifulSoup) -> Dict:
+        info = {}
+        price_range = soup.find(class_=re.compile(r'price-range|pricing', re.I))
+        if price_range:
+            info['price_range'] = price_range.get_text(strip=True)
+        cuisine = soup.find(class_=re.compile(r'cuisine|food-type', re.I))
+        if cuisine:
+            info['cuisine'] = cuisine.get_text(strip=True)
+        return info
+
+    def _get_empty_result(self) -> Dict:
+        return {'url': None, 'structured_data': {}, 'meta_data': {}, 'contact_info': {'emails': [], 'phones': [], 'address': None}, 'social_media': {}, 'business_hours': {}, 'additional_info': {}}
+
+
+# Enriches many websites concurrently over one pooled aiohttp session. `concurrency` caps
+# in-flight requests overall and `per_host` caps them per hostname; results keep the
+# shape and order of the sync extractor.
+class AsyncWebsiteDataExtractor(WebsiteDataExtractor):
+    def __init__(self, concurrency: int = 20, per_host: int = 2, timeout: int = 20, cache: Optional[HttpCache] = None, single_pass: bool = True):
+        super().__init__(cache=cache, single_pass=single_pass)
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.timeout = timeout
+        self._global_limit = None
+        self._host_limits = {}
+
+    def extract_all(self, urls: List[str], desc: str = "Processing websites",
+                    on_result: Optional[Callable[[str, Dict], None]] = None) -> List[Dict]:
+        return run_async(self.extract_many(urls, desc, on_result))
+
+    # The pooled session with fresh limits; extract_structured_data_async calls share it. Must be
+    # opened on the event loop that runs those calls.
+    def open_session(self) -> aiohttp.ClientSession:
+        self._global_limit = asyncio.Semaphore(self.concurrency)
+        # A host's semaphore lives only while a request holds it, so a long-lived session does
+        # not keep one per host it ever fetched
+        self._host_limits = weakref.WeakValueDictionary()
+        connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.per_host, ssl=False, ttl_dns_cache=300)
+        return aiohttp.ClientSession(connector=connector, headers=DEFAULT_HEADERS)
+
+    # With `on_result` every result is handed over as soon as it is ready instead of being collected
+    async def extract_many(self, urls: List[str], desc: str = "Processing websites",
+                           on_result: Optional[Callable[[str, Dict], None]] = None) -> List[Dict]:
+        async with self.open_session() as session:
+            results = [None] * len(urls)
+
+            async def run(index, url):
+                data = await self.extract_structured_data_async(url, session)
+                if on_result:
+                    on_result(url, data)
+                else:
+                    results[index] = data
+
+            tasks = [asyncio.ensure_future(run(index, url)) for index, url in enumerate(urls)]
+            for task in tqdm(asyncio.as_completed(tasks), total=len(tasks), desc=desc):
+                await task
+        return results
+
+    async def extract_structured_data_async(self, url: str, session: aiohttp.ClientSession) -> Dict:
+        if not url or url == "N/A":
+            return self._get_empty_result()
+        loop = asyncio.get_event_loop()
+        try:
+            html = await self._fetch_with_retries(session, self._normalize_url(url))
+            document = await loop.run_in_executor(None, self._parse_document, html)
+            contact_urls = self._find_contact_links(document, url)
+            contact_pages = await asyncio.gather(
+                *(self._fetch(session, contact_url, 10) for contact_url in contact_urls),
+                return_exceptions=True
+            )
+            contact_pages = [page for page in contact_pages if isinstance(page, str)]
+            result = await loop.run_in_executor(None, self._assemble_result, url, document, contact_pages)
+            result['js_rendered'] = looks_js_rendered(html)
+            return result
+        except Exception as e:
+            print(f"Error extracting data from {url}: {str(e)}")
+            metrics.count_error('websites', e)
+            return self._get_empty_result()
+
+    async def _fetch_with_retries(self, session: aiohttp.ClientSession, url: str) -> str:
+        return await self._fetch(session, url, self.timeout, retries=2)
+
+    async def _fetch(self, session: aiohttp.ClientSession, url: str, timeout: int, retries: int = 0) -> str:
+        entry, headers = None, {}
+        if self.cache is not None:
+            body, entry, headers = self.cache.lookup(url)
+            if body is not None:
+                metrics.increment('website_cache_hits')
+                return body
+        host = urlparse(url).hostname or ''
+        host_limit = self._host_limits.get(host)
+        if host_limit is None:
+            host_limit = self._host_limits[host] = asyncio.Semaphore(self.per_host)
+
+        async def send():
+            started = time.perf_counter()
+            async with session.get(url, timeout=aiohttp.ClientTimeout(total=timeout), headers=headers) as response:
+                if response.status == 304 and entry:
+                    # No body to decode; get_encoding() raises before one has been read
+                    metrics.observe('website_fetch_seconds', time.perf_counter() - started, host)
+                    return response.status, response.headers, ''
+                body = await response.read()
+                metrics.observe('website_fetch_seconds', time.perf_counter() - started, host)
+                return response.status, response.headers, body.decode(response.get_encoding(), errors='replace')
+
+        # The slots are taken outside the limiter's timing, so queueing for one never counts as host latency
+        async with self._global_limit, host_limit:
+            status, response_headers, text = await limiter.call_async(url, send, lambda result: result[:2], retries, 'website_retries')
+        if status == 304 and entry:
+            metrics.increment('website_revalidated')
+            self.cache.revalidated(url, entry, response_headers)
+            return entry['body']
+        metrics.add_bytes('websites', len(text))
+        if self.cache is not None:
+            self.cache.store(url, status, response_headers, text)
+        return text